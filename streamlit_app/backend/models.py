@@ -1,8 +1,11 @@
 # models.py
 import requests
+from requests.adapters import HTTPAdapter
 import base64
+import json
 from PIL import Image
 import io
+from concurrent.futures import ThreadPoolExecutor
 
 # ========================
 # CONFIGURATION
@@ -13,14 +16,21 @@ MISTRAL_API_KEY = "nvapi-QWO7umWz0Aa9tyz9m8sbAIUYbFpsxw9wtEtnwnC7Y_Y8oW8-AxADTlY
 LLAMA_URL = "https://integrate.api.nvidia.com/v1/chat/completions"
 MISTRAL_URL = "https://integrate.api.nvidia.com/v1/chat/completions"
 
+# Shared HTTP session so API calls reuse pooled keep-alive connections
+http_session = requests.Session()
+http_session.mount("https://", HTTPAdapter(pool_connections=10, pool_maxsize=10))
+
 # ========================
 # 1. LLaMA 3.3 - Chat Only
 # ========================
-def chat_with_llama(prompt: str, history=None, stream=False):
+def chat_with_llama(prompt: str, history=None, stream=False, system_prompt=None):
     """
     Sends a text-only prompt to LLaMA 3.3 (70B) and returns response.
+    A fixed system_prompt is sent as its own leading message so the server can reuse its prefix across calls.
     """
     messages = []
+    if system_prompt:
+        messages.append({"role": "system", "content": system_prompt})
     if history:
         for user_msg, assistant_msg in history:
             messages.append({"role": "user", "content": user_msg})
@@ -43,9 +53,11 @@ def chat_with_llama(prompt: str, history=None, stream=False):
         "stream": stream
     }
 
-    response = requests.post(LLAMA_URL, headers=headers, json=payload)
+    response = http_session.post(LLAMA_URL, headers=headers, json=payload, stream=stream)
 
     if stream:
+        # An error body has no "data:" lines, so surface it instead of streaming nothing
+        response.raise_for_status()
         def stream_generator():
             for line in response.iter_lines():
                 if line and line.decode("utf-8").startswith("data: "):
@@ -54,15 +66,53 @@ def chat_with_llama(prompt: str, history=None, stream=False):
 
     return response.json()["choices"][0]["message"]["content"]
 
+def chat_with_llama_stream(prompt: str, history=None, system_prompt=None):
+    """
+    Streams a LLaMA 3.3 response, yielding the text chunks as they arrive.
+    """
+    for data in chat_with_llama(prompt, history=history, stream=True, system_prompt=system_prompt):
+        if data.strip() == "[DONE]":
+            break
+        delta = json.loads(data)["choices"][0].get("delta", {})
+        if delta.get("content"):
+            yield delta["content"]
+
+def chat_with_llama_batch(prompts, history=None, max_workers=4, system_prompt=None):
+    """
+    Sends several independent prompts to LLaMA 3.3 as one batch and returns
+    the responses in the same order as the prompts.
+    The chat endpoint takes one conversation per call, so the calls are overlapped on a thread pool.
+    """
+    if not prompts:
+        return []
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(prompts))) as executor:
+        return list(executor.map(
+            lambda prompt: chat_with_llama(prompt, history=history, system_prompt=system_prompt),
+            prompts
+        ))
+
 # ========================
 # 2. Mistral - Image + Text
 # ========================
+MAX_IMAGE_SIZE = 1024
+JPEG_QUALITY = 85
+
+def prepare_image_for_vlm(image: Image.Image, max_size: int = MAX_IMAGE_SIZE) -> Image.Image:
+    """
+    Downscales an image so its longest side is at most max_size and converts it to RGB.
+    """
+    image = image.copy()
+    image.thumbnail((max_size, max_size), Image.LANCZOS)
+    return image.convert("RGB")
+
+
 def encode_image_to_base64(image: Image.Image) -> str:
     """
-    Converts a PIL Image to a base64-encoded string.
+    Converts a PIL Image to a base64-encoded JPEG string, downscaled for the vision model.
     """
     buffered = io.BytesIO()
-    image.save(buffered, format="PNG")
+    prepare_image_for_vlm(image).save(buffered, format="JPEG", quality=JPEG_QUALITY)
     return base64.b64encode(buffered.getvalue()).decode("utf-8")
 
 
@@ -85,7 +135,7 @@ def image_to_text_mistral(image: Image.Image, prompt: str = "Describe this image
                 "role": "user",
                 "content": [
                     {"type": "text", "text": prompt},
-                    {"type": "image_url", "image_url": {"url": f"data:image/png;base64,{base64_image}"}}
+                    {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{base64_image}"}}
                 ]
             }
         ],
@@ -95,7 +145,7 @@ def image_to_text_mistral(image: Image.Image, prompt: str = "Describe this image
         "stream": stream
     }
 
-    response = requests.post(MISTRAL_URL, headers=headers, json=payload)
+    response = http_session.post(MISTRAL_URL, headers=headers, json=payload)
 
     if stream:
         def stream_generator():
@@ -10,16 +10,31 @@ from langchain.text_splitter import RecursiveCharacterTextSplitter
 import hashlib
 from pathlib import Path
 import glob
+from collections import Counter
+from functools import lru_cache
+
+# Number of set bits in every possible byte, for Hamming distances over packed embeddings
+POPCOUNT_TABLE = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1)
 
 class EmergencyKnowledgeVectorDB:
-    def __init__(self, model_name="all-MiniLM-L6-v2", local_storage_path="./data/vector_db", pdf_path="./data/pdfs"):
+    def __init__(self, model_name="all-MiniLM-L6-v2", local_storage_path="./data/vector_db", pdf_path="./data/pdfs", use_binary=False, use_gpu=False):
         """
-        Initialize the vector database for emergency knowledge with local storage
+        Initialize the vector database for emergency knowledge with local storage.
+        With use_binary, searches run on sign-binarized embeddings (Hamming distance);
+        with use_gpu, every index built or loaded is served from the first GPU when faiss-gpu has one
         """
         self.model = SentenceTransformer(model_name)
+        # Per-instance memo so repeated queries skip the encoder forward pass
+        self.encode_query = lru_cache(maxsize=1024)(self._encode_query)
         self.documents = []
+        self.category_counts = Counter()
         self.embeddings = None
         self.index = None
+        self.use_binary = use_binary
+        self.use_gpu = use_gpu
+        self.gpu_resources = None
+        self.packed_embeddings = None
+        self.binary_index = None
         self.storage_path = local_storage_path
         self.pdf_path = pdf_path
         
@@ -97,6 +112,16 @@ class EmergencyKnowledgeVectorDB:
         
         self.category_similarity_threshold = 0.3
         self.content_relevance_threshold = 0.20
+        
+        # IVF-PQ needs enough vectors to train its coarse and product quantizers;
+        # smaller knowledge bases stay on an exact flat index
+        self.ivf_min_documents = 10000
+        self.ivf_nprobe = 8
+        
+        # Below this size a NumPy popcount scan beats the overhead of a FAISS binary search call
+        self.numpy_binary_max_documents = 50000
+        # Binary candidates re-scored with the FP32 embeddings; 0 returns the raw Hamming ranking
+        self.binary_rerank_candidates = 50
 
 
     def initialize_with_fallback(self):
@@ -413,6 +438,12 @@ class EmergencyKnowledgeVectorDB:
         
         return all_documents
     
+    def update_category_counts(self):
+        """
+        Recount documents per category after the document list changes
+        """
+        self.category_counts = Counter(doc.get('category', 'unknown') for doc in self.documents)
+    
     def print_category_distribution(self):
         """
         Print distribution of documents across categories
@@ -420,13 +451,8 @@ class EmergencyKnowledgeVectorDB:
         if not self.documents:
             return
         
-        category_counts = {}
-        for doc in self.documents:
-            category = doc.get('category', 'unknown')
-            category_counts[category] = category_counts.get(category, 0) + 1
-        
         print("\nCategory Distribution:")
-        for category, count in sorted(category_counts.items()):
+        for category, count in sorted(self.category_counts.items()):
             category_name = self.emergency_categories.get(category, {}).get('name', category)
             print(f"  {category_name}: {count} documents")
         
@@ -620,6 +646,7 @@ class EmergencyKnowledgeVectorDB:
         print(f"  Final document count: {len(relevant_documents)}")
         
         self.documents = relevant_documents
+        self.update_category_counts()
         
         if not relevant_documents:
             print("❌ No relevant documents to process after filtering!")
@@ -633,13 +660,13 @@ class EmergencyKnowledgeVectorDB:
         try:
             self.embeddings = self.model.encode(texts, show_progress_bar=True)
             
-            # Create FAISS index
-            dimension = self.embeddings.shape[1]
-            self.index = faiss.IndexFlatIP(dimension)  # Inner Product for similarity
-            
             # Normalize embeddings for cosine similarity
             faiss.normalize_L2(self.embeddings)
+            
+            # Create FAISS index
+            self.index = self.create_index(self.embeddings)
             self.index.add(self.embeddings)
+            self.update_binary_index()
             
             print(f"✅ Vector database built successfully with {self.index.ntotal} documents")
             
@@ -652,6 +679,54 @@ class EmergencyKnowledgeVectorDB:
             print(f"❌ Error building vector database: {str(e)}")
             return False
     
+    def create_index(self, embeddings: np.ndarray):
+        """
+        Create a FAISS index for normalized embeddings, switching from exact flat
+        search to IVF-PQ once the knowledge base is large enough to train it
+        """
+        num_vectors, dimension = embeddings.shape
+        
+        if num_vectors < self.ivf_min_documents or dimension % 8 != 0:
+            return self.move_index_to_gpu(faiss.IndexFlatIP(dimension))  # Inner Product for similarity
+        
+        nlist = int(np.sqrt(num_vectors))
+        quantizer = faiss.IndexFlatIP(dimension)
+        index = faiss.IndexIVFPQ(quantizer, dimension, nlist, dimension // 8, 8, faiss.METRIC_INNER_PRODUCT)
+        
+        print(f"Training IVF-PQ index with {nlist} lists...")
+        index.train(embeddings)
+        index.nprobe = self.ivf_nprobe
+        return self.move_index_to_gpu(index)
+    
+    def update_binary_index(self):
+        """
+        Rebuild the binary index from the sign bits of the stored embeddings.
+        It is cheap to derive, so it is rebuilt on load instead of being saved
+        """
+        self.packed_embeddings = None
+        self.binary_index = None
+        if not self.use_binary or self.embeddings is None:
+            return
+        
+        self.packed_embeddings = np.packbits(self.embeddings > 0, axis=1)
+        if len(self.packed_embeddings) >= self.numpy_binary_max_documents:
+            self.binary_index = faiss.IndexBinaryFlat(self.embeddings.shape[1])
+            self.binary_index.add(self.packed_embeddings)
+    
+    def hamming_search(self, query_packed: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Brute-force Hamming search over the packed embeddings with a byte popcount table.
+        Returns (distances, indices) shaped like a FAISS search result
+        """
+        distances = POPCOUNT_TABLE[np.bitwise_xor(self.packed_embeddings, query_packed)].sum(axis=1)
+        k = min(k, len(distances))
+        if k == 0:
+            return np.empty((1, 0)), np.empty((1, 0), dtype=np.int64)
+        
+        top = np.argpartition(distances, k - 1)[:k]
+        top = top[np.argsort(distances[top], kind="stable")]
+        return distances[top][None, :], top[None, :]
+    
     def add_documents_to_existing_db(self, new_documents: List[Dict]):
         """
         Add new documents to existing database without full rebuild
@@ -695,6 +770,7 @@ class EmergencyKnowledgeVectorDB:
         try:
             # Add to documents list
             self.documents.extend(filtered_documents)
+            self.update_category_counts()
             
             # Create embeddings for new documents only
             new_texts = [doc["content"] for doc in filtered_documents]
@@ -712,9 +788,10 @@ class EmergencyKnowledgeVectorDB:
             # Add to index
             if self.index is None:
                 dimension = new_embeddings.shape[1]
-                self.index = faiss.IndexFlatIP(dimension)
+                self.index = self.move_index_to_gpu(faiss.IndexFlatIP(dimension))
             
             self.index.add(new_embeddings)
+            self.update_binary_index()
             
             print(f"✅ Successfully added {len(filtered_documents)} new documents to existing database")
             
@@ -730,6 +807,28 @@ class EmergencyKnowledgeVectorDB:
 
 
 
+    def move_index_to_gpu(self, index):
+        """
+        Return a copy of the index on the first GPU when use_gpu is set and faiss-gpu
+        and a CUDA device are available, otherwise the index unchanged
+        """
+        if not self.use_gpu or not hasattr(faiss, "StandardGpuResources") or faiss.get_num_gpus() == 0:
+            return index
+        
+        # GPU indexes only borrow these resources, so keep them alive alongside them
+        if self.gpu_resources is None:
+            self.gpu_resources = faiss.StandardGpuResources()
+        return faiss.index_cpu_to_gpu(self.gpu_resources, 0, index)
+    
+    def _encode_query(self, query: str) -> np.ndarray:
+        """
+        Encode a query into a normalized (1, d) embedding. Reached through the
+        cached encode_query, so callers must not modify the returned array
+        """
+        query_embedding = self.model.encode([query])
+        faiss.normalize_L2(query_embedding)
+        return query_embedding
+    
     def search(self, query: str, k: int = 3) -> List[Tuple[Dict, float]]:
         """
         Search for relevant documents
@@ -737,16 +836,41 @@ class EmergencyKnowledgeVectorDB:
         if self.index is None:
             return []
         
-        # Encode query
-        query_embedding = self.model.encode([query])
-        faiss.normalize_L2(query_embedding)
+        return self.search_by_vector(self.encode_query(query), k=k)
+    
+    def search_by_vector(self, query_embedding: np.ndarray, k: int = 3) -> List[Tuple[Dict, float]]:
+        """
+        Search for relevant documents with an already encoded, normalized query embedding
+        """
+        if self.index is None:
+            return []
         
         # Search
-        scores, indices = self.index.search(query_embedding, k)
+        if self.packed_embeddings is not None:
+            query_packed = np.packbits(query_embedding > 0, axis=1)
+            num_candidates = max(k, self.binary_rerank_candidates)
+            if self.binary_index is not None:
+                distances, indices = self.binary_index.search(query_packed, num_candidates)
+            else:
+                distances, indices = self.hamming_search(query_packed, num_candidates)
+            
+            if self.binary_rerank_candidates:
+                # Exact cosine over the shortlist only, keeping the best k
+                candidates = indices[0][indices[0] >= 0]
+                similarities = self.embeddings[candidates] @ query_embedding[0]
+                best = np.argsort(-similarities, kind="stable")[:k]
+                scores, indices = similarities[best][None, :], candidates[best][None, :]
+            else:
+                # Turn Hamming distance into a similarity in [-1, 1] comparable to cosine
+                scores = 1 - 2 * distances[:, :k] / self.embeddings.shape[1]
+                indices = indices[:, :k]
+        else:
+            scores, indices = self.index.search(query_embedding, k)
         
         results = []
         for i, (score, idx) in enumerate(zip(scores[0], indices[0])):
-            if idx < len(self.documents):
+            # FAISS pads with -1 when fewer than k documents match
+            if 0 <= idx < len(self.documents):
                 results.append((self.documents[idx], float(score)))
         
         return results
@@ -764,7 +888,10 @@ class EmergencyKnowledgeVectorDB:
             np.save(self.embeddings_path, self.embeddings)
             
             # Save FAISS index
-            faiss.write_index(self.index, self.index_path)
+            index = self.index
+            if hasattr(faiss, "GpuIndex") and isinstance(index, faiss.GpuIndex):
+                index = faiss.index_gpu_to_cpu(index)
+            faiss.write_index(index, self.index_path)
             
             # Save metadata
             metadata = {
@@ -772,6 +899,8 @@ class EmergencyKnowledgeVectorDB:
                 "num_documents": len(self.documents),
                 "embedding_dimension": self.embeddings.shape[1] if self.embeddings is not None else None,
                 "created_at": str(np.datetime64('now')),
+                "index_type": type(self.index).__name__,
+                "nprobe": getattr(self.index, 'nprobe', None),
                 "source_breakdown": self._get_source_breakdown()
             }
             
@@ -811,12 +940,17 @@ class EmergencyKnowledgeVectorDB:
             # Load documents
             with open(self.documents_path, 'rb') as f:
                 self.documents = pickle.load(f)
+            self.update_category_counts()
             
             # Load embeddings
             self.embeddings = np.load(self.embeddings_path)
             
             # Load FAISS index
             self.index = faiss.read_index(self.index_path)
+            if isinstance(self.index, faiss.IndexIVF):
+                self.index.nprobe = self.ivf_nprobe
+            self.index = self.move_index_to_gpu(self.index)
+            self.update_binary_index()
             
             print(f"Vector database loaded from {self.storage_path}")
             print(f"Loaded {len(self.documents)} documents")
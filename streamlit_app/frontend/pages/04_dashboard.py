@@ -8,12 +8,17 @@ import sys
 import os
 from streamlit_extras.switch_page_button import switch_page
 import datetime
+import html
+import time
+import threading
+from collections import OrderedDict
+from operator import itemgetter
 
 # Add parent directory to import path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 from backend.auth import init_session_state, get_current_user, check_authentication
 from backend.database import get_all_requests,update_request_status
-from backend.models import chat_with_llama,image_to_text_mistral
+from backend.models import chat_with_llama_batch,image_to_text_mistral
 from backend.requests_matcher import match_responders_to_requests
 
 
@@ -156,6 +161,11 @@ def display_task_cards(user_id,matches_response):
     
     # Find tasks assigned to this user
     matches = matches_response.get("matches", {})
+    if not matches:
+        # Nothing was matched at all, so there is no need to fetch request details
+        st.info("No tasks are currently matched to you.")
+        return
+
     user_tasks = []
     print(user_id)
     print(matches)
@@ -173,8 +183,8 @@ def display_task_cards(user_id,matches_response):
     if not user_tasks:
         st.info("No tasks are currently matched to you.")
         return
-    
-    # Get request details from database
+
+    # Get request details from database (only once we know there are tasks to show)
     all_requests_response = get_all_requests()
     if "data" not in all_requests_response:
         st.error("Failed to fetch request details")
@@ -196,10 +206,10 @@ def display_task_cards(user_id,matches_response):
             
             st.markdown(f"""
             <div class="request-card {urgency_class}">
-                <h4>{request_details.get("type", "Emergency")} Request in {request_details.get("location", "Unknown location")}</h4>
-                <p>{request_details.get("text", "No details available")}</p>
+                <h4>{html.escape(str(request_details.get("type", "Emergency")))} Request in {html.escape(str(request_details.get("location", "Unknown location")))}</h4>
+                <p>{html.escape(str(request_details.get("text", "No details available")))}</p>
                 <div style="font-size: 0.9rem; color: #555; margin-top: 10px;">
-                    <strong>Urgency:</strong> {urgency} • 
+                    <strong>Urgency:</strong> {html.escape(str(urgency))} • 
                     <strong>Submitted:</strong> {format_timestamp(request_details.get("timestamp"))}
                 </div>
             </div>
@@ -271,6 +281,277 @@ def format_timestamp(timestamp):
     except:
         return "Invalid date"
 
+# Every status change gives a request a new summary key, so the shared
+# store drops stale and least recently used summaries
+SUMMARY_CACHE_MAX_ENTRIES = 500
+SUMMARY_CACHE_TTL = 24 * 3600  # 1 day
+
+@st.cache_resource
+def get_summary_cache():
+    """
+    Process-wide LRU store of AI request summaries, shared between sessions
+    
+    Returns:
+        tuple: (OrderedDict of summary key -> (summary, created_at), lock guarding it)
+    """
+    return OrderedDict(), threading.Lock()
+
+def summary_key(request):
+    """Cache key for a request summary - changes whenever the request is updated"""
+    return (
+        request.get("id"),
+        request.get("lastUpdated"),
+        request.get("text", ""),
+        request.get("location", "Unknown"),
+        request.get("urgency", "Unknown"),
+    )
+
+# Shared instructions for every request summary, sent once as the system message
+SUMMARY_SYSTEM_PROMPT = "You are an emergency triage assistant. For the request below, make a summery and list of instructions to how to handle the situations."
+
+def build_summary_prompt(request):
+    """Build the per-request part of the summary prompt"""
+    return f"Request: {request.get('text', '')}\nLocation: {request.get('location', 'Unknown')}\nUrgency: {request.get('urgency', 'Unknown')}"
+
+def summary_flag(request):
+    """Session state key set once the user asks for a request's AI summary"""
+    return f"show_summary_{request.get('id')}"
+
+def summarize_requests(requests):
+    """Get AI summaries for a list of requests
+    
+    Summaries that are not cached yet are generated together in a single
+    batch, so a render costs one round of LLM calls instead of one per request.
+    
+    Args:
+        requests: List of request dictionaries
+        
+    Returns:
+        Dictionary mapping summary_key(request) to its summary
+    """
+    cache, lock = get_summary_cache()
+    now = time.time()
+    summaries = {}
+    missing = {}
+    with lock:
+        for request in requests:
+            key = summary_key(request)
+            entry = cache.get(key)
+            if entry and now - entry[1] <= SUMMARY_CACHE_TTL:
+                cache.move_to_end(key)
+                summaries[key] = entry[0]
+            else:
+                missing[key] = request
+    
+    if missing:
+        prompts = [build_summary_prompt(request) for request in missing.values()]
+        generated = dict(zip(missing, chat_with_llama_batch(prompts, system_prompt=SUMMARY_SYSTEM_PROMPT)))
+        summaries.update(generated)
+        with lock:
+            for key, summary in generated.items():
+                cache[key] = (summary, now)
+                cache.move_to_end(key)
+            while len(cache) > SUMMARY_CACHE_MAX_ENTRIES:
+                cache.popitem(last=False)
+    
+    return summaries
+
+URGENCY_CLASSES = {"High": "high", "Medium": "medium"}
+URGENCY_ORDER = {"High": 0, "Medium": 1, "Low": 2, "Unknown": 3}
+
+def prepare_request_cards(requests):
+    """Pre-compute the CSS classes, formatted timestamps, escaped user fields and sort key for request cards in one pass
+    
+    Args:
+        requests: List of request dictionaries
+        
+    Returns:
+        List of card dictionaries holding the request and its display fields
+    """
+    return [
+        {
+            "request": r,
+            "type": html.escape(str(r.get("type", "General"))),
+            "status": html.escape(str(r.get("status", "pending"))),
+            "location": html.escape(str(r.get("location", "Not specified"))),
+            "urgency": html.escape(str(r.get("urgency", "Unknown"))),
+            "urgency_class": URGENCY_CLASSES.get(r.get("urgency"), "low"),
+            "status_class": f"status-{html.escape(str(r.get('status', 'pending')))}",
+            "submitted": format_timestamp(r.get("timestamp")),
+            "updated": format_timestamp(r.get("lastUpdated")),
+            "sort_key": (URGENCY_ORDER.get(r.get("urgency", "Unknown"), 4), -(r.get("timestamp", 0) or 0)),
+        }
+        for r in requests
+    ]
+
+def request_card_html(card, summery):
+    """Build the HTML for an active request card
+    
+    Args:
+        card: Card dictionary from prepare_request_cards
+        summery: Summary (or request text) shown in the card body; escaped here
+        
+    Returns:
+        HTML string for the card
+    """
+    # The card is rendered with unsafe_allow_html, so user and model text must not carry markup
+    summery = html.escape(str(summery)).replace("\n", "<br>")
+    return f"""
+    <div style ='color:#455;' class="request-card {card['urgency_class']}">
+        <div style="display: flex; justify-content: space-between; align-items: center; margin-bottom: 0.5rem;">
+            <div>
+                <strong>{card["type"]} Request</strong> • 
+                <span class="status-badge {card['status_class']}">{card["status"]}</span>
+            </div>
+            <div style="color: #777; font-size: 0.8rem;">{card["submitted"]}</div>
+        </div>
+        <p>{summery}</p>
+        <div style="font-size: 0.9rem; color: #555;">
+            <strong>Location:</strong> {card["location"]} • 
+            <strong>Urgency:</strong> {card["urgency"]}
+        </div>
+        <div style="font-size: 0.9rem; color: #555;">
+            <strong>Last Updated:</strong> {card["updated"]}
+        </div>
+    </div>
+    """
+
+REQUESTS_PER_PAGE = 10
+
+def change_page(page_key, step):
+    """Move a paginated list by step pages (button callback)"""
+    st.session_state[page_key] = st.session_state.get(page_key, 0) + step
+
+def get_page(items, page_key, per_page=REQUESTS_PER_PAGE):
+    """Get the slice of items for the page stored in session state
+    
+    Args:
+        items: Full list to paginate
+        page_key: Session state key holding the current page index
+        per_page: Number of items per page
+        
+    Returns:
+        Tuple of (page items, page index, page count)
+    """
+    page_count = max(1, (len(items) + per_page - 1) // per_page)
+    page = min(max(st.session_state.get(page_key, 0), 0), page_count - 1)
+    st.session_state[page_key] = page
+    return items[page * per_page:(page + 1) * per_page], page, page_count
+
+def render_page_controls(page_key, page, page_count):
+    """Render Previous/Next controls for a paginated list"""
+    if page_count <= 1:
+        return
+    
+    col_prev, col_info, col_next = st.columns([1, 2, 1])
+    with col_prev:
+        st.button("◀ Previous", key=f"{page_key}_prev", on_click=change_page, args=(page_key, -1),
+                  disabled=page == 0, use_container_width=True)
+    with col_info:
+        st.markdown(f"<div style='text-align: center;'>Page {page + 1} of {page_count}</div>", unsafe_allow_html=True)
+    with col_next:
+        st.button("Next ▶", key=f"{page_key}_next", on_click=change_page, args=(page_key, 1),
+                  disabled=page >= page_count - 1, use_container_width=True)
+
+def update_request_in_place(request, status):
+    """
+    Update a request's status and apply the stored result to the local request dictionary,
+    so the page can show the change without a full rerun
+    
+    Args:
+        request: Request dictionary to update
+        status: New status
+        
+    Returns:
+        dict: Response from update_request_status
+    """
+    update_response = update_request_status(request.get("id"), status)
+    if "data" in update_response:
+        request.update(update_response["data"])
+    return update_response
+
+# Card buttons by request status: (label, widget key prefix, new status, success message)
+REQUEST_CARD_ACTIONS = {
+    "pending": ("Take Action", "take", "processing", "Request status updated!"),
+    "processing": ("Mark Resolved", "resolve", "resolved", "Request marked as resolved!"),
+}
+
+def render_request_tabs(requests, actions):
+    """Render active requests as paginated cards in All/High/Medium/Low urgency tabs
+    
+    Args:
+        requests: List of active request dictionaries
+        actions: Mapping of request status to the card's button, as in REQUEST_CARD_ACTIONS
+    """
+    if not requests:
+        st.info("No active requests at this time")
+        return
+    
+    # Build the card display fields, then sort by urgency and timestamp on the pre-computed key
+    cards = sorted(prepare_request_cards(requests), key=itemgetter("sort_key"))
+    sorted_requests = [card["request"] for card in cards]
+    
+    # Summaries are only generated for cards the user has opened them on,
+    # and all of those are fetched together in one batch
+    summaries = summarize_requests([r for r in sorted_requests if st.session_state.get(summary_flag(r))])
+    
+    # Group the cards by urgency in a single pass (keeps the sorted order)
+    tab_labels = ["All", "High", "Medium", "Low"]
+    urgency_buckets = {"High": [], "Medium": [], "Low": []}
+    for card in cards:
+        bucket = urgency_buckets.get(card["request"].get("urgency"))
+        if bucket is not None:
+            bucket.append(card)
+    
+    # Create tabs for different urgency levels
+    tabs = st.tabs(tab_labels)
+    
+    for tab_idx, tab in enumerate(tabs):
+        with tab:
+            filtered = cards if tab_idx == 0 else urgency_buckets[tab_labels[tab_idx]]
+            
+            if not filtered:
+                st.info(f"No {'active' if tab_idx == 0 else tab_labels[tab_idx].lower() + ' urgency'} requests")
+                continue
+                
+            page_key = f"request_page_{tab_idx}"
+            page_cards, page, page_count = get_page(filtered, page_key)
+            
+            for i, card in enumerate(page_cards, start=page * REQUESTS_PER_PAGE):
+                request = card["request"]
+                flag = summary_flag(request)
+                
+                with st.expander(f"{request.get('type', 'General')} - {request.get('location', 'Unknown')}"):
+                    # Only call the LLM once the user asks for the summary
+                    if not st.session_state.get(flag):
+                        if st.button("✨ Generate AI Summary", key=f"summarize_{tab_idx}_{i}", use_container_width=True):
+                            st.session_state[flag] = True
+                    
+                    if st.session_state.get(flag):
+                        key = summary_key(request)
+                        if key not in summaries:
+                            summaries.update(summarize_requests([request]))
+                        summery = summaries[key]
+                    else:
+                        summery = request.get("text", "")
+                    
+                    card_placeholder = st.empty()
+                    card_placeholder.markdown(request_card_html(card, summery), unsafe_allow_html=True)
+                    
+                    action = actions.get(request.get("status"))
+                    if action:
+                        label, key_prefix, new_status, success_message = action
+                        if st.button(label, key=f"{key_prefix}_{tab_idx}_{i}", use_container_width=True):
+                            update_response = update_request_in_place(request, new_status)
+                            if "data" in update_response:
+                                # Redraw just this card instead of rerunning the whole page
+                                card_placeholder.markdown(request_card_html(prepare_request_cards([request])[0], summery), unsafe_allow_html=True)
+                                st.success(success_message)
+                            else:
+                                st.error(f"Error updating request: {update_response.get('error', 'Unknown error')}")
+            
+            render_page_controls(page_key, page, page_count)
+
 def render_sidebar():
     """Render the sidebar with navigation"""
     user = get_current_user()
@@ -516,87 +797,7 @@ def render_volunteer_dashboard():
         # All active emergency requests
         st.markdown("### All Active Emergency Requests")
         active_requests = [r for r in all_requests if r.get("status") != "resolved"]
-        
-        if not active_requests:
-            st.info("No active requests at this time")
-        else:
-            # Sort by urgency and timestamp
-            urgency_order = {"High": 0, "Medium": 1, "Low": 2, "Unknown": 3}
-            sorted_requests = sorted(active_requests, 
-                                    key=lambda x: (urgency_order.get(x.get("urgency", "Unknown"), 4), 
-                                                -(x.get("timestamp", 0) or 0)))
-            
-            # Create tabs for different urgency levels
-            tabs = st.tabs(["All", "High", "Medium", "Low"])
-            
-            for tab_idx, tab in enumerate(tabs):
-                with tab:
-                    if tab_idx == 0:
-                        filtered = sorted_requests
-                    elif tab_idx == 1:
-                        filtered = [r for r in sorted_requests if r.get("urgency") == "High"]
-                    elif tab_idx == 2:
-                        filtered = [r for r in sorted_requests if r.get("urgency") == "Medium"]
-                    else:
-                        filtered = [r for r in sorted_requests if r.get("urgency") == "Low"]
-                    
-                    if not filtered:
-                        st.info(f"No {'active' if tab_idx == 0 else tab.label.lower() + ' urgency'} requests")
-                        continue
-                        
-                    for i, request in enumerate(filtered):
-                        urgency_class = "low"
-                        if request.get("urgency") == "High":
-                            urgency_class = "high"
-                        elif request.get("urgency") == "Medium":
-                            urgency_class = "medium"
-
-                        text = request.get("text", "")
-                        prompt = f"Request: {text}\nLocation: {request.get('location', 'Unknown')}\nUrgency: {request.get('urgency', 'Unknown')} make a summery and list of instructions to how to handle the situations"
-                        summery = chat_with_llama(prompt,history="")
-                        status_class = f"status-{request.get('status', 'pending')}"
-                        
-                        with st.expander(f"{request.get('type', 'General')} - {request.get('location', 'Unknown')}"):
-                            st.markdown(f"""
-                            <div style ='color:#455;' class="request-card {urgency_class}">
-                                <div style="display: flex; justify-content: space-between; align-items: center; margin-bottom: 0.5rem;">
-                                    <div>
-                                        <strong>{request.get("type", "General")} Request</strong> • 
-                                        <span class="status-badge {status_class}">{request.get("status", "pending")}</span>
-                                    </div>
-                                    <div style="color: #777; font-size: 0.8rem;">{format_timestamp(request.get("timestamp"))}</div>
-                                </div>
-                                <p>{summery}</p>
-                                <div style="font-size: 0.9rem; color: #555;">
-                                    <strong>Location:</strong> {request.get("location", "Not specified")} • 
-                                    <strong>Urgency:</strong> {request.get("urgency", "Unknown")}
-                                </div>
-                                <div style="font-size: 0.9rem; color: #555;">
-                                    <strong>Last Updated:</strong> {format_timestamp(request.get("lastUpdated"))}
-                                </div>
-                            </div>
-                            """, unsafe_allow_html=True)
-                            
-                            col1, col2 = st.columns(2)
-                            
-                            if request.get("status") == "pending":
-                                if st.button("Take Action", key=f"take_{tab_idx}_{i}", use_container_width=True):
-                                    from backend.database import update_request_status
-                                    update_response = update_request_status(request.get("id"), "processing")
-                                    if "data" in update_response:
-                                        st.success("Request status updated!")
-                                        st.rerun()
-                                    else:
-                                        st.error(f"Error updating request: {update_response.get('error', 'Unknown error')}")
-                            elif request.get("status") == "processing":
-                                if st.button("Mark Resolved", key=f"resolve_{tab_idx}_{i}", use_container_width=True):
-                                    from backend.database import update_request_status
-                                    update_response = update_request_status(request.get("id"), "resolved")
-                                    if "data" in update_response:
-                                        st.success("Request marked as resolved!")
-                                        st.rerun()
-                                    else:
-                                        st.error(f"Error updating request: {update_response.get('error', 'Unknown error')}")
+        render_request_tabs(active_requests, REQUEST_CARD_ACTIONS)
     if st.button("🗺️ View Emergency Map", key="Map"):
             switch_page("map")
 
@@ -717,14 +918,14 @@ def render_first_responder_dashboard():
                     <div class="request-card high">
                         <div style="display: flex; justify-content: space-between; align-items: center; margin-bottom: 0.5rem;">
                             <div>
-                                <strong>{request.get("type", "General")} Emergency</strong> • 
+                                <strong>{html.escape(str(request.get("type", "General")))} Emergency</strong> • 
                                 <span style="color: #f44336; font-weight: bold;">HIGH URGENCY</span>
                             </div>
                             <div style="color: #777; font-size: 0.8rem;">{format_timestamp(request.get("timestamp"))}</div>
                         </div>
-                        <p>{request.get("text", "")}</p>
+                        <p>{html.escape(str(request.get("text", "")))}</p>
                         <div style="font-size: 0.9rem; color: #555;">
-                            <strong>Location:</strong> {request.get("location", "Not specified")}
+                            <strong>Location:</strong> {html.escape(str(request.get("location", "Not specified")))}
                         </div>
                     </div>
                     """, unsafe_allow_html=True)
@@ -732,98 +933,16 @@ def render_first_responder_dashboard():
                     col1, col2 = st.columns(2)
                     with col1:
                         if st.button("Deploy Response Team", key=f"deploy_{i}", use_container_width=True):
-                            from backend.database import update_request_status
-                            update_response = update_request_status(request.get("id"), "processing")                            
+                            update_response = update_request_in_place(request, "processing")
                             if "data" in update_response:
                                 st.success("Response team deployed!")
-                                st.rerun()
-                        else:
-                            st.error(f"Error deploying team: {update_response.get('error', 'Unknown error')}")
+                            else:
+                                st.error(f"Error deploying team: {update_response.get('error', 'Unknown error')}")
                         
         # All active emergency requests
         st.markdown("### All Active Emergency Requests")
         active_requests = [r for r in all_requests if r.get("status") != "resolved"]
-        
-        if not active_requests:
-            st.info("No active requests at this time")
-        else:
-            # Sort by urgency and timestamp
-            urgency_order = {"High": 0, "Medium": 1, "Low": 2, "Unknown": 3}
-            sorted_requests = sorted(active_requests, 
-                                    key=lambda x: (urgency_order.get(x.get("urgency", "Unknown"), 4), 
-                                                -(x.get("timestamp", 0) or 0)))
-            
-            # Create tabs for different urgency levels
-            tabs = st.tabs(["All", "High", "Medium", "Low"])
-            
-            for tab_idx, tab in enumerate(tabs):
-                with tab:
-                    if tab_idx == 0:
-                        filtered = sorted_requests
-                    elif tab_idx == 1:
-                        filtered = [r for r in sorted_requests if r.get("urgency") == "High"]
-                    elif tab_idx == 2:
-                        filtered = [r for r in sorted_requests if r.get("urgency") == "Medium"]
-                    else:
-                        filtered = [r for r in sorted_requests if r.get("urgency") == "Low"]
-                    
-                    if not filtered:
-                        st.info(f"No {'active' if tab_idx == 0 else tab.label.lower() + ' urgency'} requests")
-                        continue
-                        
-                    for i, request in enumerate(filtered):
-                        urgency_class = "low"
-                        if request.get("urgency") == "High":
-                            urgency_class = "high"
-                        elif request.get("urgency") == "Medium":
-                            urgency_class = "medium"
-
-                        text = request.get("text", "")
-                        prompt = f"Request: {text}\nLocation: {request.get('location', 'Unknown')}\nUrgency: {request.get('urgency', 'Unknown')} make a summery and list of instructions to how to handle the situations"
-                        summery = chat_with_llama(prompt,history="")
-                        status_class = f"status-{request.get('status', 'pending')}"
-                        
-                        with st.expander(f"{request.get('type', 'General')} - {request.get('location', 'Unknown')}"):
-                            st.markdown(f"""
-                            <div style ='color:#455;' class="request-card {urgency_class}">
-                                <div style="display: flex; justify-content: space-between; align-items: center; margin-bottom: 0.5rem;">
-                                    <div>
-                                        <strong>{request.get("type", "General")} Request</strong> • 
-                                        <span class="status-badge {status_class}">{request.get("status", "pending")}</span>
-                                    </div>
-                                    <div style="color: #777; font-size: 0.8rem;">{format_timestamp(request.get("timestamp"))}</div>
-                                </div>
-                                <p>{summery}</p>
-                                <div style="font-size: 0.9rem; color: #555;">
-                                    <strong>Location:</strong> {request.get("location", "Not specified")} • 
-                                    <strong>Urgency:</strong> {request.get("urgency", "Unknown")}
-                                </div>
-                                <div style="font-size: 0.9rem; color: #555;">
-                                    <strong>Last Updated:</strong> {format_timestamp(request.get("lastUpdated"))}
-                                </div>
-                            </div>
-                            """, unsafe_allow_html=True)
-                            
-                            col1, col2 = st.columns(2)
-                            
-                            if request.get("status") == "pending":
-                                if st.button("Take Action", key=f"take_{tab_idx}_{i}", use_container_width=True):
-                                    from backend.database import update_request_status
-                                    update_response = update_request_status(request.get("id"), "processing")
-                                    if "data" in update_response:
-                                        st.success("Request status updated!")
-                                        st.rerun()
-                                    else:
-                                        st.error(f"Error updating request: {update_response.get('error', 'Unknown error')}")
-                            elif request.get("status") == "processing":
-                                if st.button("Mark Resolved", key=f"resolve_{tab_idx}_{i}", use_container_width=True):
-                                    from backend.database import update_request_status
-                                    update_response = update_request_status(request.get("id"), "resolved")
-                                    if "data" in update_response:
-                                        st.success("Request marked as resolved!")
-                                        st.rerun()
-                                    else:
-                                        st.error(f"Error updating request: {update_response.get('error', 'Unknown error')}")
+        render_request_tabs(active_requests, REQUEST_CARD_ACTIONS)
         # Add a nicely styled button for the Map page
         
         if st.button("🗺️ View Emergency Map", key="Map"):
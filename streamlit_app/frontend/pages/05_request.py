@@ -6,6 +6,8 @@ This page allows users to submit emergency requests.
 import streamlit as st
 import sys
 import os
+import io
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from PIL import Image
 from streamlit_extras.switch_page_button import switch_page
 
@@ -27,7 +29,7 @@ st.set_page_config(
 init_session_state()
 
 # Define CSS
-st.markdown("""
+PAGE_CSS = """
 <style>
             
     /* Hide the default Streamlit page navigation */
@@ -122,7 +124,63 @@ st.markdown("""
         box-shadow: 0 2px 5px rgba(0, 0, 0, 0.1);
     }
 </style>
-""", unsafe_allow_html=True)
+"""
+# Re-emitted on every run: Streamlit drops any element a rerun does not write again
+st.markdown(PAGE_CSS, unsafe_allow_html=True)
+
+# Prompt used for disaster image assessment
+DISASTER_ANALYSIS_PROMPT = """
+Analyze this disaster image and provide a concise assessment of:
+1. Type of disaster visible
+2. Visible damage or hazards
+3. Any immediate safety concerns
+
+Keep it brief and factual for emergency responders.
+"""
+
+@st.cache_data(show_spinner=False)
+def analyze_disaster_image(image_bytes, prompt=DISASTER_ANALYSIS_PROMPT):
+    """Analyze a disaster image with Mistral, cached on the image bytes and prompt"""
+    image = Image.open(io.BytesIO(image_bytes))
+    return image_to_text_mistral(image, prompt)
+
+def analyze_disaster_images(images):
+    """
+    Analyze several disaster images concurrently
+    
+    Args:
+        images (dict): Mapping of a name to the raw image bytes
+        
+    Returns:
+        dict: Mapping of each name to its analysis text, or to the exception raised while analyzing it
+    """
+    if not images:
+        return {}
+    
+    results = {}
+    with ThreadPoolExecutor(max_workers=len(images)) as executor:
+        futures = {executor.submit(analyze_disaster_image, image_bytes): name for name, image_bytes in images.items()}
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                results[name] = e
+    return results
+
+def show_image_preview(image_data, caption):
+    """Display an attached image (if any)"""
+    if image_data:
+        st.image(image_data, caption=caption, use_container_width=True)
+
+def show_image_analysis(analysis, error_message):
+    """Display an image analysis result and attach it to the request being written"""
+    if isinstance(analysis, Exception):
+        st.error(f"{error_message}: {str(analysis)}")
+        return
+    
+    st.session_state["ai_analysis"] = analysis
+    st.info(f"AI assessment: {analysis}")
 
 def render_sidebar():
     """Render the sidebar with navigation"""
@@ -158,6 +216,9 @@ def render_request_form():
     st.markdown('<h1 class="main-title">Submit Emergency Request</h1>', unsafe_allow_html=True)
     st.markdown('<p class="subtitle">Please provide details about your emergency situation</p>', unsafe_allow_html=True)
     
+    # Widgets inside a form only update on submit, so the camera opt-in has to live outside it
+    use_camera = st.toggle("📷 Take a photo with your camera?", value=False, key="use_camera")
+    
     # Form for request submission
     with st.form("request_form"):
         # Emergency type
@@ -184,126 +245,60 @@ def render_request_form():
         col_img, col_upload = st.columns(2)
 
         with col_img:
-            image_data = st.camera_input("Capture Image (optional)", key="camera_input")
-            
-            # If image is captured and hasn't been analyzed yet
-            if image_data and not st.session_state.get("image_analyzed"):
-                # Display the captured image
-                st.image(image_data, caption="Captured Image", use_column_width=True)
-                
-                # Process image with Mistral
-                with st.spinner('Analyzing disaster image...'):
-                    try:
-                        # Convert to PIL Image
-                        image = Image.open(image_data)
-                        
-                        # Create prompt for disaster analysis
-                        analysis_prompt = """
-                        Analyze this disaster image and provide a concise assessment of:
-                        1. Type of disaster visible
-                        2. Visible damage or hazards
-                        3. Any immediate safety concerns
-                        
-                        Keep it brief and factual for emergency responders.
-                        """
-                        
-                        # Get analysis from Mistral
-                        analysis = image_to_text_mistral(image, analysis_prompt)
-                        
-                        # Store in session state
-                        st.session_state["ai_analysis"] = analysis
-                        st.session_state["image_analyzed"] = True
-                        
-                        # Show the analysis
-                        st.success("AI analysis complete!")
-                        st.info(f"AI assessment: {analysis}")
-                        
-                        # Offer to append to request
-                        st.session_state["append_analysis"] = True
-                        
-                    except Exception as e:
-                        st.error(f"Error analyzing image: {str(e)}")
-            
-            # If image was previously analyzed, show the analysis
-            elif image_data and st.session_state.get("image_analyzed"):
-                st.image(image_data, caption="Captured Image", use_container_width=True)
-                st.info(f"AI assessment: {st.session_state['ai_analysis']}")
-                
-            st.session_state["captured_image"] = image_data
+            # st.camera_input already shows the captured frame, so it needs no separate preview
+            image_data = st.camera_input("Capture Image (optional)", key="camera_input") if use_camera else None
         with col_upload:
             # Changed from audio to image upload
             uploaded_image = st.file_uploader("Or upload an image file", type=["jpg", "jpeg", "png"], key="image_upload")
-            
-            # If image is uploaded and hasn't been analyzed yet
-            if uploaded_image and not st.session_state.get("uploaded_image_analyzed"):
-                # Display the uploaded image
-                st.image(uploaded_image, caption="Uploaded Image", use_container_width=True)
-                
-                # Process image with Mistral
-                with st.spinner('Analyzing uploaded disaster image...'):
-                    try:
-                        # Convert to PIL Image
-                        image = Image.open(uploaded_image)
-                        
-                        # Create prompt for disaster analysis
-                        analysis_prompt = """
-                        Analyze this disaster image and provide a concise assessment of:
-                        1. Type of disaster visible
-                        2. Visible damage or hazards
-                        3. Any immediate safety concerns
-                        
-                        Keep it brief and factual for emergency responders.
-                        """
-                        
-                        # Get analysis from Mistral
-                        analysis = image_to_text_mistral(image, analysis_prompt)
-                        
-                        # Store in session state
-                        st.session_state["uploaded_ai_analysis"] = analysis
-                        st.session_state["uploaded_image_analyzed"] = True
-                        
-                        # Show the analysis
-                        st.success("AI analysis complete!")
-                        st.info(f"AI assessment: {analysis}")
-                        
-                        # Set the analysis to be used in the form
-                        st.session_state["ai_analysis"] = analysis
-                        st.session_state["image_analyzed"] = True
-                        
-                    except Exception as e:
-                        st.error(f"Error analyzing uploaded image: {str(e)}")
-            
-            # If uploaded image was previously analyzed, show the analysis
-            elif uploaded_image and st.session_state.get("uploaded_image_analyzed"):
-                st.image(uploaded_image, caption="Uploaded Image", use_column_width=True)
-                st.info(f"AI assessment: {st.session_state['uploaded_ai_analysis']}")
-                
-            st.session_state["uploaded_image"] = uploaded_image
+            show_image_preview(uploaded_image, "Uploaded Image")
+
+        # Process both images with Mistral at the same time (cached on the image bytes, so reruns reuse the result)
+        pending_images = {}
+        if image_data:
+            pending_images["camera"] = image_data.getvalue()
+        if uploaded_image:
+            pending_images["upload"] = uploaded_image.getvalue()
+        
+        with st.spinner('Analyzing disaster images...'):
+            analyses = analyze_disaster_images(pending_images)
+
+        # The uploaded image is handled last so its analysis wins when both are given
+        with col_img:
+            if "camera" in analyses:
+                show_image_analysis(analyses["camera"], "Error analyzing image")
+        with col_upload:
+            if "upload" in analyses:
+                show_image_analysis(analyses["upload"], "Error analyzing uploaded image")
         # Urgency selection
         st.markdown("### Urgency Level")
+        urgency = st.radio(
+            "Urgency Level",
+            options=["High", "Medium", "Low"],
+            index=1,
+            horizontal=True,
+            key="urgency_level",
+            label_visibility="collapsed",
+        )
         urgency_col1, urgency_col2, urgency_col3 = st.columns(3)
         
         with urgency_col1:
-            high_urgency = st.checkbox("High Urgency", value=False, key="high_urgency")
             st.markdown("""
             <div style="text-align: center; color: #c62828; font-size: 0.9rem;">
-                Life-threatening situation requiring immediate attention
+                <strong>High:</strong> Life-threatening situation requiring immediate attention
             </div>
             """, unsafe_allow_html=True)
             
         with urgency_col2:
-            medium_urgency = st.checkbox("Medium Urgency", value=True, key="medium_urgency")
             st.markdown("""
             <div style="text-align: center; color: #f57f17; font-size: 0.9rem;">
-                Urgent but not immediately life-threatening
+                <strong>Medium:</strong> Urgent but not immediately life-threatening
             </div>
             """, unsafe_allow_html=True)
             
         with urgency_col3:
-            low_urgency = st.checkbox("Low Urgency", value=False, key="low_urgency")
             st.markdown("""
             <div style="text-align: center; color: #2e7d32; font-size: 0.9rem;">
-                Requires assistance but not time-sensitive
+                <strong>Low:</strong> Requires assistance but not time-sensitive
             </div>
             """, unsafe_allow_html=True)
         
@@ -312,21 +307,26 @@ def render_request_form():
             st.session_state["auto_location"] = ""
 
         # Try to get location from browser using streamlit-js-eval
-
-        js_code = """
-        navigator.geolocation.getCurrentPosition(
-            (pos) => {
-            const coords = pos.coords.latitude + "," + pos.coords.longitude;
-            window.parent.postMessage({type: "streamlit:setComponentValue", value: coords}, "*");
-            },
-            (err) => {
-            window.parent.postMessage({type: "streamlit:setComponentValue", value: ""}, "*");
-            }
-        );
-        """
-        location_coords = streamlit_js_eval(js_expressions=js_code, key="get_location", want_output=True)
-        if location_coords and isinstance(location_coords, str) and "," in location_coords:
-            st.session_state["auto_location"] = location_coords
+        # (only until the browser has answered once per session, not on every rerun)
+        if not st.session_state.get("geo_attempted"):
+            js_code = """
+            navigator.geolocation.getCurrentPosition(
+                (pos) => {
+                const coords = pos.coords.latitude + "," + pos.coords.longitude;
+                window.parent.postMessage({type: "streamlit:setComponentValue", value: coords}, "*");
+                },
+                (err) => {
+                window.parent.postMessage({type: "streamlit:setComponentValue", value: ""}, "*");
+                },
+                {maximumAge: 600000, timeout: 5000, enableHighAccuracy: false}
+            );
+            """
+            location_coords = streamlit_js_eval(js_expressions=js_code, key="get_location", want_output=True)
+            # None means the component has not reported back yet, so keep asking on the next rerun
+            if location_coords is not None:
+                st.session_state["geo_attempted"] = True
+                if isinstance(location_coords, str) and "," in location_coords:
+                    st.session_state["auto_location"] = location_coords
 
         # Show location input with auto-detected value as default
         location = st.text_input(
@@ -350,13 +350,6 @@ def render_request_form():
                 st.error("Please provide your location")
                 return
             
-            # Determine urgency level
-            urgency = "Medium"  # Default
-            if high_urgency:
-                urgency = "High"
-            elif low_urgency:
-                urgency = "Low"
-            
             # Append AI analysis to request text if available
             full_request_text = request_text
             if st.session_state.get("ai_analysis"):
@@ -378,7 +371,6 @@ def render_request_form():
                 
                 # Clear the session state for next request
                 st.session_state["ai_analysis"] = ""
-                st.session_state["image_analyzed"] = False
             else:
                 st.error(f"Error submitting request: {response.get('error', 'Unknown error')}")
 
@@ -390,8 +382,6 @@ def render_request_form():
             # Clear analysis data for new request
             if "ai_analysis" in st.session_state:
                 del st.session_state["ai_analysis"]
-            if "image_analyzed" in st.session_state:
-                del st.session_state["image_analyzed"]
             st.rerun()
     with col2:
         if st.button("Go to Dashboard", use_container_width=True):
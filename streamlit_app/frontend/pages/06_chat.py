@@ -1,25 +1,85 @@
 import sys
 import os
+import io
+import html
+import time
 import streamlit as st
+from concurrent.futures import ThreadPoolExecutor
 from PIL import Image
-import datetime
 from streamlit_extras.switch_page_button import switch_page
 
 # Add backend to path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
-from backend.vector_db import EmergencyKnowledgeVectorDB
 from backend.auth import init_session_state, get_current_user
 
 
 # Add this import if you want image analysis
 try:
-    from backend.models import chat_with_llama, image_to_text_mistral
+    from backend.models import chat_with_llama_stream, image_to_text_mistral
     IMAGE_ANALYSIS_AVAILABLE = True
 except ImportError:
-    from backend.models import chat_with_llama
+    from backend.models import chat_with_llama_stream
     IMAGE_ANALYSIS_AVAILABLE = False
     st.warning("Image analysis not available - Mistral model not configured")
 
+# Only the per-request parts; the fixed instructions go in RAG_SYSTEM_PROMPT
+RAG_PROMPT_TEMPLATE = """CONTEXT FROM EMERGENCY KNOWLEDGE BASE:
+{context}
+
+USER QUESTION: {user_query}
+
+Please provide a comprehensive response:"""
+
+# Define system prompt
+EMERGENCY_SYSTEM_PROMPT = """You are an emergency assistance AI specifically trained to help people during natural disasters.
+Your primary goal is to provide accurate, concise, and potentially life-saving information.
+Focus on these disaster types: earthquakes, floods, hurricanes, wildfires, tsunamis, tornadoes, landslides, and extreme weather events.
+
+When responding:
+1. Prioritize immediate safety advice for the user's specific situation
+2. Provide clear, actionable instructions
+3. Consider evacuation guidance, shelter information, first aid, and resource conservation
+4. Be factual, calm, and reassuring, but emphasize the seriousness of following official guidance
+5. If medical advice is requested, emphasize the importance of professional medical care when available
+
+Remember that your advice could impact human safety in critical situations. Always recommend contacting emergency services (911) for immediate life-threatening emergencies."""
+
+# Sent unchanged as the leading system message of every chat request, so the
+# model server can reuse its cached prefix instead of re-reading it each turn
+RAG_SYSTEM_PROMPT = EMERGENCY_SYSTEM_PROMPT + """
+
+You have access to specialized emergency response knowledge. Each question comes with
+CONTEXT FROM EMERGENCY KNOWLEDGE BASE; base your answer on that context and your training,
+and provide accurate, actionable emergency guidance.
+
+IMPORTANT GUIDELINES:
+1. Prioritize immediate safety advice
+2. Provide clear, step-by-step instructions
+3. Always recommend contacting emergency services (911) for life-threatening situations
+4. Use the context provided but supplement with your knowledge when needed
+5. Be calm, reassuring, but emphasize the seriousness of following safety protocols"""
+
+# Number of (user, assistant) turns kept in session state
+MAX_HISTORY_TURNS = 20
+# Number of the most recent turns sent to the model with each question
+MODEL_HISTORY_TURNS = 6
+
+IMAGE_ANALYSIS_PROMPT = """You are analyzing an emergency situation image. Please provide:
+1. What type of emergency or disaster is visible
+2. Assessment of severity level (Low/Medium/High)
+3. Immediate safety concerns
+4. Recommended actions based on what you see
+5. What emergency services might be needed
+
+Be specific and focus on actionable emergency response information."""
+
+# Redraw the streaming answer at most this often, or after this many new chunks
+STREAM_FLUSH_SECONDS = 0.1
+STREAM_FLUSH_CHUNKS = 32
+
+# Queries shorter than this are not worth a knowledge base search
+MIN_RAG_QUERY_LENGTH = 4
+
 init_session_state()
 st.markdown("""
 <style>
@@ -50,12 +110,41 @@ st.markdown("""
 # Initialize vector database
 @st.cache_resource
 def initialize_vector_db():
-    """Initialize and load vector database"""
+    """
+    Initialize and load vector database.
+    st.cache_resource hands every session this same instance by reference, so
+    Rebuild KB rebuilds it in place rather than clearing the cache and reloading from disk
+    """
+    # One BLAS/OpenMP thread per search: concurrent sessions already give parallelism,
+    # and per-query thread pools would just fight each other for the CPU
+    os.environ.setdefault("OMP_NUM_THREADS", "1")
+    os.environ.setdefault("MKL_NUM_THREADS", "1")
+    
+    # Imported here so the sentence-transformers/FAISS stack is only loaded once, when the cache is first filled
+    from backend.vector_db import EmergencyKnowledgeVectorDB
+    
+    try:
+        import torch
+        torch.set_num_threads(1)
+        torch.set_num_interop_threads(1)
+    except Exception:
+        pass
+    try:
+        import faiss
+        faiss.omp_set_num_threads(1)
+    except Exception:
+        pass
+    
     try:
         # Initialize with local storage paths
         db = EmergencyKnowledgeVectorDB(
             local_storage_path="./data/vector_db",
-            pdf_path="./data/pdfs"
+            pdf_path="./data/pdfs",
+            # Opt-in binary (Hamming) search; it trades recall for speed, which
+            # only pays off on knowledge bases far larger than the bundled PDFs
+            use_binary=os.environ.get("VECTOR_DB_USE_BINARY") == "1",
+            # Opt-in GPU search for deployments with faiss-gpu and CUDA; applies to rebuilt indexes too
+            use_gpu=os.environ.get("FAISS_USE_GPU") == "1"
         )
         
         # Try to load from local storage first
@@ -65,7 +154,7 @@ def initialize_vector_db():
             st.success("✅ Knowledge base initialized successfully!")
         else:
             st.error("❌ Failed to initialize knowledge base")
-            
+        
         return db
         
     except Exception as e:
@@ -79,20 +168,46 @@ def initialize_vector_db():
 # Load vector database
 vector_db = initialize_vector_db()
 
+@st.cache_data(show_spinner=False, ttl=3600, max_entries=512)
+def search_knowledge_base(query: str, k: int = 3):
+    """
+    Search the vector database, reusing results for repeated queries
+    """
+    return vector_db.search(query, k=k)
+
+@st.cache_data(show_spinner=False, ttl=60)
+def load_pdf_status(_db):
+    """PDF folder status, refreshed at most once a minute"""
+    return _db.get_pdf_status()
+
+@st.cache_data(show_spinner=False, ttl=60)
+def load_database_info(_db):
+    """Saved database metadata, refreshed at most once a minute"""
+    return _db.get_database_info()
+
+@st.cache_resource
+def get_executor():
+    """Shared worker pool for the blocking search and model calls"""
+    return ThreadPoolExecutor(max_workers=4)
+
 def get_rag_context(query: str, k: int = 3) -> str:
     """
     Get relevant context from vector database
     """
-    results = vector_db.search(query, k=k)
+    # The embedding model is uncased, so case and surrounding whitespace don't change the results
+    query = query.strip().lower()
+    # Too short to match anything meaningful, so skip the embedding and search
+    if len(query) < MIN_RAG_QUERY_LENGTH:
+        return ""
+    
+    results = search_knowledge_base(query, k=k)
     
     if not results:
         return ""
     
-    context_parts = []
-    for doc, score in results:
-        context_parts.append(f"**{doc['title']}** (Category: {doc['category']}):\n{doc['content']}")
-    
-    return "\n\n".join(context_parts)
+    return "\n\n".join(
+        f"**{doc['title']}** (Category: {doc['category']}):\n{doc['content']}" for doc, score in results
+    )
 
 def render_sidebar():
     """Render the sidebar with navigation"""
@@ -127,48 +242,15 @@ def create_rag_prompt(user_query: str, context: str) -> str:
     """
     Create enhanced prompt with RAG context
     """
-    return f"""You are an emergency assistance AI with access to specialized emergency response knowledge.
-
-CONTEXT FROM EMERGENCY KNOWLEDGE BASE:
-{context}
-
-Based on the above context and your training, please provide accurate, actionable emergency guidance.
-
-IMPORTANT GUIDELINES:
-1. Prioritize immediate safety advice
-2. Provide clear, step-by-step instructions
-3. Always recommend contacting emergency services (911) for life-threatening situations
-4. Use the context provided but supplement with your knowledge when needed
-5. Be calm, reassuring, but emphasize the seriousness of following safety protocols
-
-USER QUESTION: {user_query}
-
-Please provide a comprehensive response:"""
+    return RAG_PROMPT_TEMPLATE.format(context=context, user_query=user_query)
 
-
-
-# Define system prompt
-EMERGENCY_SYSTEM_PROMPT = """You are an emergency assistance AI specifically trained to help people during natural disasters.
-Your primary goal is to provide accurate, concise, and potentially life-saving information.
-Focus on these disaster types: earthquakes, floods, hurricanes, wildfires, tsunamis, tornadoes, landslides, and extreme weather events.
-
-When responding:
-1. Prioritize immediate safety advice for the user's specific situation
-2. Provide clear, actionable instructions
-3. Consider evacuation guidance, shelter information, first aid, and resource conservation
-4. Be factual, calm, and reassuring, but emphasize the seriousness of following official guidance
-5. If medical advice is requested, emphasize the importance of professional medical care when available
-
-Remember that your advice could impact human safety in critical situations. Always recommend contacting emergency services (911) for immediate life-threatening emergencies."""
-
-IMAGE_ANALYSIS_PROMPT = """You are analyzing an emergency situation image. Please provide:
-1. What type of emergency or disaster is visible
-2. Assessment of severity level (Low/Medium/High)
-3. Immediate safety concerns
-4. Recommended actions based on what you see
-5. What emergency services might be needed
-
-Be specific and focus on actionable emergency response information."""
+@st.cache_data(show_spinner=False, max_entries=64)
+def analyze_emergency_image(image_bytes: bytes, prompt: str = IMAGE_ANALYSIS_PROMPT) -> str:
+    """
+    Analyze an emergency image with Mistral, cached on the image bytes and prompt
+    """
+    image = Image.open(io.BytesIO(image_bytes))
+    return image_to_text_mistral(image, prompt)
 
 
 
@@ -184,24 +266,38 @@ if "chat_messages" not in st.session_state:
 if "chat_history" not in st.session_state or not isinstance(st.session_state.chat_history, list):
     st.session_state.chat_history = []
 
-if "user_input" not in st.session_state:
-    st.session_state.user_input = ""
-
-def render_message(message, is_user=False):
-    avatar = "👤" if is_user else "🆘"
-    alignment = "flex-end" if is_user else "flex-start"
-    bg_color = "#BAD99E" if is_user else "#A3AEF6"
-    st.markdown(f"""
-    <div style="display: flex; justify-content: {alignment}; margin-bottom: 10px;">
-        <div style="background-color: {bg_color}; padding: 10px 15px; border-radius: 15px; max-width: 80%;">
-            <div style="display: flex; align-items: center; margin-bottom: 5px;">
-                <div style="margin-right: 10px; font-size: 1.5rem;">{avatar}</div>
-                <div><strong>{'You' if is_user else 'Emergency Assistant'}</strong></div>
-            </div>
-            <div>{message}</div>
-        </div>
-    </div>
-    """, unsafe_allow_html=True)
+if "formatted_history" not in st.session_state:
+    st.session_state.formatted_history = list(zip(st.session_state.chat_history[::2], st.session_state.chat_history[1::2]))
+
+CHAT_BUBBLE_TEMPLATE = (
+    '<div style="display: flex; justify-content: {alignment}; margin-bottom: 10px;">'
+    '<div style="background-color: {bg_color}; padding: 10px 15px; border-radius: 15px; max-width: 80%;">'
+    '<div style="display: flex; align-items: center; margin-bottom: 5px;">'
+    '<div style="margin-right: 10px; font-size: 1.5rem;">{avatar}</div>'
+    '<div><strong>{name}</strong></div>'
+    '</div>'
+    '<div>{content}</div>'
+    '</div>'
+    '</div>'
+)
+
+# Bubble styling per speaker, indexed by is_user
+CHAT_BUBBLE_STYLES = {
+    True: {"avatar": "👤", "alignment": "flex-end", "bg_color": "#BAD99E", "name": "You"},
+    False: {"avatar": "🆘", "alignment": "flex-start", "bg_color": "#A3AEF6", "name": "Emergency Assistant"},
+}
+
+def message_html(message, is_user=False):
+    """Build the chat bubble HTML for a single message"""
+    content = html.escape(message).replace("\n", "<br>")
+    return CHAT_BUBBLE_TEMPLATE.format(content=content, **CHAT_BUBBLE_STYLES[is_user])
+
+def render_messages(messages):
+    """Render the whole conversation as a single markdown element"""
+    st.markdown(
+        "".join(message_html(message["content"], message["role"] == "user") for message in messages),
+        unsafe_allow_html=True
+    )
 
 # Layout
 col1, col2 = st.columns([2, 1])
@@ -220,23 +316,25 @@ with col1:
     
     if uploaded_image:
         st.image(uploaded_image, caption="Emergency Image for Analysis", width=300)
+        
+        # Start the analysis as soon as the image is attached, so Send usually finds it finished
+        if st.session_state.get("image_analysis_id") != uploaded_image.file_id:
+            st.session_state.image_analysis_id = uploaded_image.file_id
+            st.session_state.image_analysis_future = get_executor().submit(
+                analyze_emergency_image, uploaded_image.getvalue()
+            )
 
 
     chat_container = st.container()
     with chat_container:
-        for message in st.session_state.chat_messages:
-            render_message(message["content"], message["role"] == "user")
-
-    # Check if we need to clear the input
-    if "clear_input" in st.session_state and st.session_state["clear_input"]:
-        st.session_state["user_input"] = ""
-        st.session_state["clear_input"] = False
-
-    user_input = st.text_area("Type your message:", height=100, key="user_input")
-    col_send, col_clear, col_rebuild = st.columns([2, 1, 1])
+        render_messages(st.session_state.chat_messages)
 
-    with col_send:
-        send_button = st.button("Send", use_container_width=True)
+    # Typing inside a form doesn't rerun the page; only Send does (and clears the box)
+    with st.form("chat_form", clear_on_submit=True):
+        user_input = st.text_area("Type your message:", height=100, key="user_input")
+        send_button = st.form_submit_button("Send", use_container_width=True)
+    
+    col_clear, col_rebuild = st.columns(2)
     
     with col_clear:
         if st.button("Clear Chat", use_container_width=True):
@@ -244,6 +342,8 @@ with col1:
                 {"role": "assistant", "content": "I'm your Emergency Assistant with access to comprehensive disaster response knowledge. How can I help you with your current situation?"}
             ]
             st.session_state.chat_history = []
+            st.session_state.formatted_history = []
+            st.session_state.pop("last_rag", None)
             st.rerun()
 
     with col_rebuild:
@@ -253,14 +353,16 @@ with col1:
                     success = vector_db.build_vector_database(force_rebuild=True)
                     if success:
                         vector_db.save_locally()
-                        st.success("Knowledge base rebuilt!")
-                        # Clear cache to reload
-                        st.cache_resource.clear()
+                        # The cached database was rebuilt in place, so only the lookups derived from it are stale
+                        search_knowledge_base.clear()
+                        load_pdf_status.clear()
+                        load_database_info.clear()
+                        st.session_state.pop("last_rag", None)
+                        st.toast("Knowledge base rebuilt!")
                     else:
                         st.error("Failed to rebuild knowledge base")
                 except Exception as e:
                     st.error(f"Error rebuilding: {str(e)}")
-            st.rerun()
 
 
     if send_button and user_input.strip():
@@ -268,64 +370,104 @@ with col1:
         
         # Add user message
         st.session_state.chat_messages.append({"role": "user", "content": current_input})
+        with chat_container:
+            response_placeholder = st.empty()
+            response_placeholder.markdown(message_html(current_input, True), unsafe_allow_html=True)
+        
+        # The previous answer is only reused for the same question, and its key
+        # starts with this text, so a repeat skips the knowledge base search
+        last_rag = st.session_state.get("last_rag", {})
+        may_repeat = last_rag.get("q", "").startswith(current_input.strip().lower())
+        
+        # Otherwise search the knowledge base while the image (if any) is still being analyzed
+        rag_future = None if may_repeat else get_executor().submit(get_rag_context, current_input)
+        image_future = st.session_state.image_analysis_future if uploaded_image else None
         
         # Handle image analysis if uploaded
         image_context = ""
-        if uploaded_image:
+        if image_future:
             try:
                 with st.spinner("Analyzing emergency image..."):
-                    image = Image.open(uploaded_image)
-                    image_analysis = image_to_text_mistral(image, IMAGE_ANALYSIS_PROMPT)
+                    image_analysis = image_future.result()
                     image_context = f"\n\nIMAGE ANALYSIS:\n{image_analysis}"
             except Exception as e:
                 image_context = f"\n\nIMAGE ANALYSIS ERROR: {str(e)}"
+                # Analyze the same image again on the next run instead of keeping the failure
+                st.session_state.pop("image_analysis_id", None)
         
-        # Get RAG context
-        with st.spinner("Searching knowledge base..."):
-            rag_context = get_rag_context(current_input + image_context)
+        # Reuse the previous answer when the same question is sent again
+        query_key = (current_input + image_context).strip().lower()
         
-        # Create enhanced prompt
-        enhanced_prompt = create_rag_prompt(current_input + image_context, rag_context)
-        
-        # Format history for the model
-        formatted_history = [
-            (st.session_state.chat_history[i], st.session_state.chat_history[i + 1])
-            for i in range(0, len(st.session_state.chat_history) - 1, 2)
-            if i + 1 < len(st.session_state.chat_history)
-        ]
-        
-        # Get response from model
-        with st.spinner("Generating response..."):
+        if last_rag.get("q") == query_key:
+            rag_context = last_rag["ctx"]
+            response = last_rag["resp"]
+        else:
+            # Get RAG context
+            with st.spinner("Searching knowledge base..."):
+                rag_context = rag_future.result() if rag_future else get_rag_context(current_input)
+            
+            # Create enhanced prompt
+            enhanced_prompt = create_rag_prompt(current_input + image_context, rag_context)
+            
+            # History already paired up as (user, assistant) turns; only the latest go to the model
+            formatted_history = st.session_state.formatted_history[-MODEL_HISTORY_TURNS:]
+            
+            # Stream the response from the model as it is generated
+            chunks = []
+            pending = 0
+            last_flush = time.monotonic()
             try:
-                response = chat_with_llama(enhanced_prompt, history=formatted_history)
+                for chunk in chat_with_llama_stream(enhanced_prompt, history=formatted_history, system_prompt=RAG_SYSTEM_PROMPT):
+                    chunks.append(chunk)
+                    pending += 1
+                    # Batch redraws; the finished answer is drawn once more below
+                    if pending >= STREAM_FLUSH_CHUNKS or time.monotonic() - last_flush >= STREAM_FLUSH_SECONDS:
+                        response_placeholder.markdown(
+                            message_html(current_input, True) + message_html("".join(chunks)),
+                            unsafe_allow_html=True
+                        )
+                        pending = 0
+                        last_flush = time.monotonic()
+                response = "".join(chunks)
                 
                 # Add context information
                 if rag_context:
                     response += "\n\n---\n*This response was enhanced with information from our emergency response knowledge base.*"
                 
+                st.session_state.last_rag = {"q": query_key, "ctx": rag_context, "resp": response}
+                
             except Exception as e:
                 response = f"⚠️ An error occurred while contacting the AI model: {str(e)}"
         
         # Update chat history
         st.session_state.chat_history.append(current_input + image_context)
         st.session_state.chat_history.append(response)
+        st.session_state.formatted_history.append((current_input + image_context, response))
+        
+        # Bound the stored history as well
+        if len(st.session_state.formatted_history) > MAX_HISTORY_TURNS:
+            st.session_state.formatted_history = st.session_state.formatted_history[-MAX_HISTORY_TURNS:]
+            st.session_state.chat_history = st.session_state.chat_history[-2 * MAX_HISTORY_TURNS:]
         
         # Add assistant response
         st.session_state.chat_messages.append({"role": "assistant", "content": response})
         
-        st.rerun()
+        # The placeholder already holds the finished turn, so no rerun is needed
+        response_placeholder.markdown(
+            message_html(current_input, True) + message_html(response),
+            unsafe_allow_html=True
+        )
 
 
 with col2:
 
     st.markdown("### 📄 PDF Sources")
     if vector_db:
-        pdf_status = vector_db.get_pdf_status()
+        pdf_status = load_pdf_status(vector_db)
         if pdf_status['pdf_count'] > 0:
             st.success(f"✅ {pdf_status['pdf_count']} PDF files processed")
             with st.expander("PDF Sources"):
-                for pdf in pdf_status['pdf_files']:
-                    st.write(f"📄 {pdf}")
+                st.markdown("\n\n".join(f"📄 {pdf}" for pdf in pdf_status['pdf_files']))
         else:
             st.warning("⚠️ No PDF files found")
             st.info("Add PDF files to `./data/pdfs/` folder and rebuild")
@@ -335,22 +477,28 @@ with col2:
         st.success(f"✅ Loaded {vector_db.index.ntotal} emergency protocols")
         
         # Show database info
-        db_info = vector_db.get_database_info()
+        db_info = load_database_info(vector_db)
         if db_info:
             with st.expander("Database Details"):
-                st.write(f"**Created:** {db_info.get('created_at', 'Unknown')}")
-                st.write(f"**Documents:** {db_info.get('num_documents', 'Unknown')}")
-                st.write(f"**Model:** {db_info.get('model_name', 'Unknown')}")
+                details = [
+                    f"**Created:** {db_info.get('created_at', 'Unknown')}",
+                    f"**Documents:** {db_info.get('num_documents', 'Unknown')}",
+                    f"**Model:** {db_info.get('model_name', 'Unknown')}",
+                    f"**Index:** {db_info.get('index_type', 'Unknown')}"
+                    + (f" (nprobe {db_info['nprobe']})" if db_info.get('nprobe') else ""),
+                ]
                 
                 # Show source breakdown
                 if 'source_breakdown' in db_info:
-                    st.write("**Sources:**")
-                    for source, count in db_info['source_breakdown'].items():
-                        st.write(f"  - {source}: {count} chunks")
+                    details.append("**Sources:**\n" + "\n".join(
+                        f"- {source}: {count} chunks" for source, count in db_info['source_breakdown'].items()
+                    ))
+                
+                st.markdown("\n\n".join(details))
     else:
         st.error("❌ Knowledge base not loaded")
         if st.button("🔄 Initialize Knowledge Base"):
-            st.cache_resource.clear()
+            initialize_vector_db.clear()
             st.rerun()
     
     # Emergency Contacts
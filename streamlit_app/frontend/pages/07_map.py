@@ -6,13 +6,18 @@ This page displays all emergency requests on an interactive map.
 import streamlit as st
 import sys
 import os
-import folium
-from streamlit_folium import st_folium
+import re
+from streamlit.components.v1 import html as components_html
 import requests
+from requests.adapters import HTTPAdapter
 import json
-import pandas as pd
+import hashlib
 from datetime import datetime, timedelta
 import time
+import heapq
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from itertools import compress
 from streamlit_extras.switch_page_button import switch_page
 
 # Add parent directory to import path
@@ -27,12 +32,6 @@ st.set_page_config(
     layout="wide",
 )
 
-@st.cache_data(ttl=3600)  # Cache for 1 hour
-def cached_geocode_address(address):
-    """Cached version of geocode_address_with_fallback"""
-    return geocode_address_with_fallback(address)
-
-
 # Initialize session state
 init_session_state()
 
@@ -126,143 +125,408 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# Known Sri Lankan towns, used to skip or back up the geocoding service
+SRI_LANKAN_LOCATIONS = {
+    "chilaw": (7.5759, 79.7953),
+    "bingiriya": (7.5667, 80.1000),
+    "colombo": (6.9271, 79.8612),
+    "kandy": (7.2906, 80.6337),
+    "galle": (6.0535, 80.2210),
+    "jaffna": (9.6615, 80.0255),
+    "anuradhapura": (8.3114, 80.4037),
+    "trincomalee": (8.5874, 81.2152),
+    "batticaloa": (7.7102, 81.6924),
+    "ratnapura": (6.6828, 80.3992),
+    "negombo": (7.2083, 79.8358),
+    "matara": (5.9549, 80.5550),
+    "kurunegala": (7.4863, 80.3647),
+    "badulla": (6.9934, 81.0550),
+    "polonnaruwa": (7.9403, 81.0188)
+}
+
+# One pass over an address finds any known town, however large the table grows.
+# Streamlit re-executes this page script on every rerun, so the pattern is built
+# again each run; re's own pattern cache makes the compile step a lookup.
+SRI_LANKAN_LOCATION_PATTERN = re.compile(
+    "|".join(re.escape(name) for name in sorted(SRI_LANKAN_LOCATIONS, key=len, reverse=True))
+)
+
+# Set NOMINATIM_URL to a self-hosted Nominatim to lift the rate limit;
+# the public endpoint only permits one request per second
+PUBLIC_NOMINATIM_URL = "https://nominatim.openstreetmap.org/search"
+NOMINATIM_URL = os.environ.get("NOMINATIM_URL", PUBLIC_NOMINATIM_URL)
+GEOCODE_WORKERS = 16
+# Public lookups still start one second apart, but a few workers let their
+# round trips overlap instead of waiting for each response in turn
+PUBLIC_GEOCODE_WORKERS = 4
+
+@st.cache_resource
+def get_geocode_session():
+    """Shared keep-alive HTTP session for geocoding requests"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=GEOCODE_WORKERS, pool_maxsize=GEOCODE_WORKERS)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    # Add User-Agent header to comply with Nominatim usage policy
+    session.headers["User-Agent"] = "SafeBridge-Emergency-App/1.0"
+    return session
+
+@st.cache_resource
+def get_public_nominatim_throttle():
+    """Lock and last request time shared by every session using the public endpoint"""
+    return threading.Lock(), [0.0]
+
+def wait_for_public_nominatim():
+    """Space requests to the public Nominatim endpoint at least one second apart"""
+    lock, last_request = get_public_nominatim_throttle()
+    with lock:
+        delay = 1.0 - (time.time() - last_request[0])
+        if delay > 0:
+            time.sleep(delay)
+        last_request[0] = time.time()
+
+# "latitude,longitude" strings, as sent by the request page's location capture
+COORDINATES_PATTERN = re.compile(r"^\s*(-?\d+(?:\.\d+)?)\s*,\s*(-?\d+(?:\.\d+)?)\s*$")
+
+def normalize_address(address):
+    """Lowercase an address and collapse whitespace and trailing punctuation"""
+    return " ".join(address.lower().split()).rstrip(",.")
+
+def address_cache_key(address):
+    """
+    Build the geocode cache key for an address, so spelling variants of
+    the same place ("Colombo", "colombo ", "Colombo, Sri Lanka") share one entry
+    """
+    components = [part.strip() for part in normalize_address(address).split(",")]
+    components = [part for part in components if part and part != "sri lanka"]
+    # Keep coordinates and street numbers in their original order
+    if not any(char.isdigit() for char in address):
+        components.sort()
+    return ", ".join(components)
+
 def geocode_address(address):
     """
     Convert address to coordinates using a geocoding service
     For demo purposes, using Nominatim (OpenStreetMap)
+    
+    Runs in geocoding worker threads, which can't draw Streamlit elements,
+    so problems are returned for the caller to report.
+    
+    Returns:
+        tuple: (lat, lon, error); lat and lon are None and error describes why on failure
     """
     try:
         # Check if it's already coordinates (latitude,longitude format)
-        if "," in address and len(address.split(",")) == 2:
-            coords = address.split(",")
-            # Try to convert to float - if successful, it's coordinates
-            try:
-                lat = float(coords[0].strip())
-                lon = float(coords[1].strip())
-                # Validate coordinate ranges
-                if -90 <= lat <= 90 and -180 <= lon <= 180:
-                    return lat, lon
-                else:
-                    # Invalid coordinate range, treat as address
-                    pass
-            except ValueError:
-                # Not numeric coordinates, treat as address
-                pass
+        match = COORDINATES_PATTERN.match(address)
+        if match:
+            lat, lon = float(match.group(1)), float(match.group(2))
+            # Out-of-range values are treated as an address
+            if -90 <= lat <= 90 and -180 <= lon <= 180:
+                return lat, lon, None
+        
+        # A bare town name we already know needs no lookup
+        normalized = normalize_address(address)
+        if normalized in SRI_LANKAN_LOCATIONS:
+            lat, lon = SRI_LANKAN_LOCATIONS[normalized]
+            return lat, lon, None
         
         # Use Nominatim for geocoding addresses
-        url = "https://nominatim.openstreetmap.org/search"
         params = {
-            "q": address,
             "format": "json",
             "limit": 1,
             "addressdetails": 1
         }
         
-        # Add User-Agent header to comply with Nominatim usage policy
-        headers = {
-            "User-Agent": "SafeBridge-Emergency-App/1.0"
-        }
+        # "town, district" is sent as a structured query, anything else as free text
+        components = [part.strip() for part in address.split(",")]
+        if len(components) == 2 and all(components) and "sri lanka" not in normalized:
+            params["city"] = components[0]
+            params["country"] = "Sri Lanka"
+        else:
+            params["q"] = address
+        
+        if NOMINATIM_URL == PUBLIC_NOMINATIM_URL:
+            wait_for_public_nominatim()
         
-        response = requests.get(url, params=params, headers=headers, timeout=10)
+        response = get_geocode_session().get(NOMINATIM_URL, params=params, timeout=10)
         if response.status_code == 200:
             data = response.json()
             if data and len(data) > 0:
                 result = data[0]
                 lat = float(result["lat"])
                 lon = float(result["lon"])
-                return lat, lon
+                return lat, lon, None
             else:
-                st.warning(f"No results found for address: {address}")
+                return None, None, f"No results found for address: {address}"
         else:
-            st.warning(f"Geocoding service returned status code: {response.status_code}")
+            return None, None, f"Geocoding service returned status code: {response.status_code}"
             
     except requests.exceptions.Timeout:
-        st.warning(f"Timeout while geocoding address: {address}")
+        return None, None, f"Timeout while geocoding address: {address}"
     except requests.exceptions.RequestException as e:
-        st.warning(f"Network error while geocoding address: {address}. Error: {str(e)}")
+        return None, None, f"Network error while geocoding address: {address}. Error: {str(e)}"
     except Exception as e:
-        #st.warning(f"Could not geocode address: {address}. Error: {str(e)}")
-        pass
-    
-    return None, None
+        return None, None, f"Could not geocode address: {address}. Error: {str(e)}"
 
 def geocode_address_with_fallback(address):
     """
     Enhanced geocoding with fallback options for Sri Lankan locations
+    
+    Returns:
+        tuple: (lat, lon, status, error) where status is "exact", "approximate" (centre
+        of a known town named in the address) or "failed" (lat and lon are None), and
+        error describes the failed lookup for the latter two
     """
     if not address or address.strip() == "":
-        return None, None
+        return None, None, "failed", None
     
     # Try the main geocoding function first
-    lat, lon = geocode_address(address)
+    lat, lon, error = geocode_address(address)
     if lat is not None and lon is not None:
-        return lat, lon
+        return lat, lon, "exact", None
     
     # Fallback: Try with "Sri Lanka" appended
     if "sri lanka" not in address.lower():
         enhanced_address = f"{address}, Sri Lanka"
-        lat, lon = geocode_address(enhanced_address)
+        lat, lon, _ = geocode_address(enhanced_address)
         if lat is not None and lon is not None:
-            return lat, lon
+            return lat, lon, "exact", None
     
     # Fallback: Try common Sri Lankan location mappings
-    sri_lankan_locations = {
-        "chilaw": (7.5759, 79.7953),
-        "bingiriya": (7.5667, 80.1000),
-        "colombo": (6.9271, 79.8612),
-        "kandy": (7.2906, 80.6337),
-        "galle": (6.0535, 80.2210),
-        "jaffna": (9.6615, 80.0255),
-        "anuradhapura": (8.3114, 80.4037),
-        "trincomalee": (8.5874, 81.2152),
-        "batticaloa": (7.7102, 81.6924),
-        "ratnapura": (6.6828, 80.3992),
-        "negombo": (7.2083, 79.8358),
-        "matara": (5.9549, 80.5550),
-        "kurunegala": (7.4863, 80.3647),
-        "badulla": (6.9934, 81.0550),
-        "polonnaruwa": (7.9403, 81.0188)
-    }
+    match = SRI_LANKAN_LOCATION_PATTERN.search(address.lower())
+    if match:
+        lat, lon = SRI_LANKAN_LOCATIONS[match.group(0)]
+        return lat, lon, "approximate", error
+    
+    # Left unplaced rather than dropped on a default spot that looks like a real location
+    return None, None, "failed", error
+
+# Geocodes are kept on disk so every session (and server restart) reuses them
+GEOCODE_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "safebridge-geocode", "geocodes.json")
+GEOCODE_CACHE_TTL = 30 * 24 * 3600  # 30 days
+GEOCODE_CACHE_MAX_ENTRIES = 10000
+# Fallbacks and failures may just be a Nominatim outage, so they are kept
+# in memory only, and briefly, to avoid retrying them on every load
+GEOCODE_FALLBACK_TTL = 10 * 60  # 10 minutes
+
+@st.cache_resource
+def get_geocode_cache():
+    """
+    Load the persistent geocode cache once per server process
+    
+    Returns:
+        tuple: (dict of cache key -> [lat, lon, geocoded_at] for exact geocodes,
+        in-memory dict of cache key -> [lat, lon, geocoded_at, status, error] for
+        fallbacks and failures, lock guarding both)
+    """
+    try:
+        with open(GEOCODE_CACHE_PATH, "r") as f:
+            entries = json.load(f)
+    except (OSError, ValueError):
+        entries = {}
+    return entries, {}, threading.Lock()
+
+def prune_geocode_cache(entries, now):
+    """Drop expired entries, then the oldest ones beyond the size cap"""
+    for key in [key for key, entry in entries.items() if now - entry[2] > GEOCODE_CACHE_TTL]:
+        del entries[key]
+    
+    excess = len(entries) - GEOCODE_CACHE_MAX_ENTRIES
+    if excess > 0:
+        for key in heapq.nsmallest(excess, entries, key=lambda key: entries[key][2]):
+            del entries[key]
+
+def save_geocode_cache(entries):
+    """Write the geocode cache to disk, replacing the file atomically"""
+    try:
+        os.makedirs(os.path.dirname(GEOCODE_CACHE_PATH), exist_ok=True)
+        tmp_path = GEOCODE_CACHE_PATH + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(entries, f)
+        os.replace(tmp_path, GEOCODE_CACHE_PATH)
+    except OSError as e:
+        print(f"Could not save geocode cache: {e}")
+
+def geocode_many(addresses):
+    """
+    Geocode a batch of addresses, calling the geocoding service only for those not cached yet
+    
+    Args:
+        addresses (iterable): Address strings; blanks and duplicates are skipped
+        
+    Returns:
+        tuple: (dict mapping each address to its (lat, lon, geocoded_at, status), where
+        status is "exact", "approximate" or "failed" as from geocode_address_with_fallback;
+        list of errors behind the addresses that were not geocoded exactly)
+    """
+    entries, fallbacks, lock = get_geocode_cache()
+    now = time.time()
+    keys = {address: address_cache_key(address) for address in addresses if address and address.strip()}
+    
+    # One representative address per cache key is enough to geocode it
+    to_lookup = {}
+    with lock:
+        for key in [key for key, entry in fallbacks.items() if now - entry[2] > GEOCODE_FALLBACK_TTL]:
+            del fallbacks[key]
+        for address, key in keys.items():
+            if key in fallbacks:
+                continue
+            if key not in entries or now - entries[key][2] > GEOCODE_CACHE_TTL:
+                to_lookup.setdefault(key, address)
+    
+    results = {}
+    if to_lookup:
+        workers = PUBLIC_GEOCODE_WORKERS if NOMINATIM_URL == PUBLIC_NOMINATIM_URL else GEOCODE_WORKERS
+        with ThreadPoolExecutor(max_workers=min(workers, len(to_lookup))) as executor:
+            results = dict(zip(to_lookup, executor.map(geocode_address_with_fallback, to_lookup.values())))
+    
+    with lock:
+        for key, (lat, lon, status, error) in results.items():
+            if status == "exact":
+                entries[key] = [lat, lon, now]
+                fallbacks.pop(key, None)
+            else:
+                fallbacks[key] = [lat, lon, now, status, error]
+        
+        # An expired exact geocode still beats a fallback from a failed refresh
+        coordinates = {
+            address: (*entries[key], "exact") if key in entries else tuple(fallbacks[key][:4])
+            for address, key in keys.items()
+        }
+        errors = [
+            fallbacks[key][4] for key in set(keys.values())
+            if key not in entries and fallbacks[key][4]
+        ]
+        
+        if any(result[2] == "exact" for result in results.values()):
+            prune_geocode_cache(entries, now)
+            save_geocode_cache(entries)
+    
+    return coordinates, errors
+
+def attach_coordinates(records):
+    """
+    Store lat, lon, geocoded_at and geocode_status on records that have not been
+    geocoded yet, so the map can read coordinates straight off the data on every rerun.
+    Records without a location, or whose location could not be geocoded, get no
+    coordinates and are left off the map.
+    
+    Returns:
+        str: A summary of the locations that could not be placed exactly, or None
+    """
+    pending = [record for record in records if "geocoded_at" not in record]
+    if not pending:
+        return None
     
-    # Check if the address contains any known Sri Lankan location
-    address_lower = address.lower()
-    for location, coords in sri_lankan_locations.items():
-        if location in address_lower:
-            st.info(f"Using fallback coordinates for {location}")
-            return coords
+    coordinates, errors = geocode_many(record.get("location", "") for record in pending)
+    for record in pending:
+        lat, lon, geocoded_at, status = coordinates.get(record.get("location", ""), (None, None, None, "failed"))
+        record["lat"], record["lon"], record["geocoded_at"], record["geocode_status"] = lat, lon, geocoded_at, status
     
-    # Last fallback: Default to Colombo, Sri Lanka
-    # st.warning(f"Could not geocode '{address}'. Using default location (Colombo, Sri Lanka)")
-    return 6.9271, 79.8612  # Colombo coordinates
+    # One summary for the whole batch; the caller shows it outside any cache
+    located = [record for record in pending if (record.get("location") or "").strip()]
+    approximate = sum(1 for record in located if record["geocode_status"] == "approximate")
+    unplaced = sum(1 for record in located if record["geocode_status"] == "failed")
+    if approximate or unplaced:
+        message = (
+            f"Could not geocode {approximate + unplaced} location(s): {approximate} shown at "
+            f"the centre of a town named in the address, {unplaced} left off the map."
+        )
+        if errors:
+            message += f" Example: {errors[0]}"
+        return message
+    return None
+
+# Timestamps are shown in the server's local time, as datetime.fromtimestamp did
+LOCAL_TIMEZONE = datetime.now().astimezone().tzinfo
 
+def attach_time_strings(requests_data):
+    """
+    Format every request's submission time once, in one vectorized pass.
+    Sets time_str (with year) for popups and details and short_time_str for tables.
+    """
+    import pandas as pd
+    
+    if not requests_data:
+        return requests_data
+    
+    timestamps = pd.to_numeric(pd.Series([r.get("timestamp", 0) for r in requests_data]), errors="coerce").fillna(0)
+    local_times = pd.to_datetime(timestamps, unit="ms", utc=True).dt.tz_convert(LOCAL_TIMEZONE)
+    full_strings = local_times.dt.strftime("%b %d, %Y %I:%M %p")
+    short_strings = local_times.dt.strftime("%b %d, %I:%M %p")
+    
+    for request, timestamp, full, short in zip(requests_data, timestamps, full_strings, short_strings):
+        request["time_str"] = full if timestamp else "Unknown"
+        request["short_time_str"] = short if timestamp else "Unknown"
+    return requests_data
+
+class DataLoadError(Exception):
+    """Raised by the cached loaders on failure; st.cache_data does not cache exceptions"""
+
+@st.cache_data(ttl=30, show_spinner="Loading emergency data...")
+def load_all_requests():
+    """
+    Load all emergency requests with their display times and coordinates,
+    shared across sessions for a short time. The response also carries
+    "frame", the requests' columnar view from requests_frame, and
+    "geocode_warning", the geocoding summary from attach_coordinates.
+    
+    Raises:
+        DataLoadError: If the requests could not be loaded
+    """
+    response = get_all_requests()
+    if "data" not in response:
+        raise DataLoadError(response.get("error", "Unknown error"))
+    response["geocode_warning"] = attach_coordinates(attach_time_strings(response["data"]))
+    response["frame"] = requests_frame(response["data"])
+    return response
+
+@st.cache_data(ttl=60, show_spinner="Loading responders and volunteers...")
 def load_responders_and_volunteers():
-    """Load first responders and volunteers from database"""
+    """
+    Load first responders and volunteers from database, with their coordinates
+    
+    Returns:
+        tuple: (list of responders, their columnar view from responders_frame,
+                geocoding summary from attach_coordinates or None)
+    
+    Raises:
+        DataLoadError: If the responders could not be loaded
+    """
     try:
         response = get_all_responders()
-        if "data" not in response:
-            st.error(f"Error loading responders: {response.get('error', 'Unknown error')}")
-            return []
-        return response["data"]
     except Exception as e:
-        st.error(f"Error loading responders and volunteers: {e}")
-        return []
+        raise DataLoadError(f"Error loading responders and volunteers: {e}") from e
+    if "data" not in response:
+        raise DataLoadError(f"Error loading responders: {response.get('error', 'Unknown error')}")
+    responders_data = response["data"]
+    geocode_warning = attach_coordinates(responders_data)
+    return responders_data, responders_frame(responders_data), geocode_warning
+
+def get_responders_and_volunteers():
+    """
+    Load responders and volunteers through the cache and show any error or
+    geocoding warning on this run, since cached calls don't replay them
+    
+    Returns:
+        tuple: (list of responders, their columnar view from responders_frame)
+    """
+    try:
+        responders_data, people, geocode_warning = load_responders_and_volunteers()
+    except DataLoadError as e:
+        st.error(str(e))
+        return [], responders_frame([])
+    if geocode_warning:
+        st.warning(geocode_warning)
+    return responders_data, people
 
-def create_responder_icon(person_type, is_available):
-    """Create custom icons for volunteers and first responders"""
+def get_responder_style(person_type, is_available):
+    """Get marker color and icon for volunteers and first responders"""
     if person_type.lower() == 'volunteer':
         # Volunteer icons - Heart symbol
-        color = 'green' if is_available else 'red'
-        icon = 'heart'
-    else:  # first_responder
-        # First responder icons - Plus symbol
-        color = 'blue' if is_available else 'gray'
-        icon = 'plus'
-    
-    return folium.Icon(
-        color=color,
-        icon=icon,
-        prefix='glyphicon'
-    )
+        return ('green' if is_available else 'red'), 'heart'
+    # First responder icons - Plus symbol
+    return ('blue' if is_available else 'gray'), 'plus'
 
 def format_specialities(specialities):
     """Format specialities list for display"""
@@ -286,95 +550,127 @@ def create_responder_popup_content(person_data):
     type_emoji = "🚑" if person_type.lower() == 'first_responder' else "❤️"
     type_label = f"{type_emoji} {person_type.replace('_', ' ').title()}"
     
-    popup_html = f"""
-    <div style="font-family: Arial, sans-serif; min-width: 250px;">
-        <h4 style="margin: 0 0 15px 0; color: #333; border-bottom: 2px solid #ddd; padding-bottom: 8px;">
-            {name}
-        </h4>
-        <div style="margin: 8px 0;">
-            <strong>{type_label}</strong>
-        </div>
-        <div style="margin: 8px 0;">
-            <strong>📍 Location:</strong> {location}
-        </div>
-        <div style="margin: 8px 0;">
-            <strong>🛠️ Specialities:</strong> {specialities}
-        </div>
-        <div style="margin: 8px 0;">
-            <strong>Status:</strong> {status}
-        </div>
-        <div style="margin-top: 10px; font-size: 0.85em; color: #666;">
-            Click to view more details
-        </div>
-    </div>
-    """
-    return popup_html
+    _, responder_template = get_popup_templates()
+    return responder_template.render(
+        name=name,
+        type_label=type_label,
+        location=location,
+        specialities=specialities,
+        status=status
+    )
+
 
+# Marker color for each (status, urgency) pair
+MARKER_COLORS = {
+    ("resolved", "High"): "green",
+    ("resolved", "Medium"): "green",
+    ("resolved", "Low"): "green",
+    ("processing", "High"): "orange",
+    ("processing", "Medium"): "blue",
+    ("processing", "Low"): "lightblue",
+    ("pending", "High"): "red",
+    ("pending", "Medium"): "orange",
+    ("pending", "Low"): "yellow"
+}
+# Color when the urgency is missing or unexpected
+STATUS_MARKER_COLORS = {"resolved": "green", "processing": "lightblue"}
+
+MARKER_ICONS = {
+    "Medical": "plus",
+    "Food": "cutlery",
+    "Shelter": "home",
+    "Evacuation": "arrow-right",
+    "Other": "info-sign"
+}
 
 def get_marker_color(status, urgency):
     """Get marker color based on status and urgency"""
-    if status == "resolved":
-        return "green"
-    elif status == "processing":
-        if urgency == "High":
-            return "orange"
-        elif urgency == "Medium":
-            return "blue"
-        else:
-            return "lightblue"
-    else:  # pending
-        if urgency == "High":
-            return "red"
-        elif urgency == "Medium":
-            return "orange"
-        else:
-            return "yellow"
+    return MARKER_COLORS.get((status, urgency)) or STATUS_MARKER_COLORS.get(status, "yellow")
 
 def get_marker_icon(request_type):
     """Get marker icon based on request type"""
-    icon_map = {
-        "Medical": "plus",
-        "Food": "cutlery",
-        "Shelter": "home",
-        "Evacuation": "arrow-right",
-        "Other": "info-sign"
-    }
-    return icon_map.get(request_type, "info-sign")
+    return MARKER_ICONS.get(request_type, "info-sign")
 
-def format_popup_content(request):
-    """Format popup content for map markers"""
-    timestamp = request.get("timestamp", 0)
-    if timestamp:
-        dt = datetime.fromtimestamp(timestamp / 1000)
-        time_str = dt.strftime("%b %d, %Y %I:%M %p")
-    else:
-        time_str = "Unknown"
-    
-    popup_html = f"""
+# Colors for the status and urgency labels in request popups
+STATUS_COLORS = {"resolved": "green", "processing": "orange"}
+URGENCY_COLORS = {"High": "red", "Medium": "orange"}
+
+REQUEST_POPUP_TEMPLATE = """
     <div style="min-width: 250px;">
         <h4 style="margin-bottom: 10px; color: #333;">
-            {request.get('type', 'Unknown')} Emergency
+            {{ type }} Emergency
         </h4>
         <p><strong>Status:</strong> 
-            <span style="color: {'green' if request.get('status') == 'resolved' else 'orange' if request.get('status') == 'processing' else 'red'};">
-                {request.get('status', 'Unknown').title()}
+            <span style="color: {{ status_color }};">
+                {{ status }}
             </span>
         </p>
         <p><strong>Urgency:</strong> 
-            <span style="color: {'red' if request.get('urgency') == 'High' else 'orange' if request.get('urgency') == 'Medium' else 'green'};">
-                {request.get('urgency', 'Unknown')}
+            <span style="color: {{ urgency_color }};">
+                {{ urgency }}
             </span>
         </p>
-        <p><strong>Location:</strong> {request.get('location', 'Not specified')}</p>
-        <p><strong>Submitted:</strong> {time_str}</p>
+        <p><strong>Location:</strong> {{ location }}</p>
+        <p><strong>Submitted:</strong> {{ time_str }}</p>
         <p><strong>Description:</strong></p>
         <p style="font-style: italic; max-width: 200px; word-wrap: break-word;">
-            {request.get('text', 'No description')[:100]}...
+            {{ text }}...
         </p>
-        <p><strong>Request ID:</strong> {request.get('id', 'Unknown')}</p>
+        <p><strong>Request ID:</strong> {{ id }}</p>
+    </div>
+    """
+
+RESPONDER_POPUP_TEMPLATE = """
+    <div style="font-family: Arial, sans-serif; min-width: 250px;">
+        <h4 style="margin: 0 0 15px 0; color: #333; border-bottom: 2px solid #ddd; padding-bottom: 8px;">
+            {{ name }}
+        </h4>
+        <div style="margin: 8px 0;">
+            <strong>{{ type_label }}</strong>
+        </div>
+        <div style="margin: 8px 0;">
+            <strong>📍 Location:</strong> {{ location }}
+        </div>
+        <div style="margin: 8px 0;">
+            <strong>🛠️ Specialities:</strong> {{ specialities }}
+        </div>
+        <div style="margin: 8px 0;">
+            <strong>Status:</strong> {{ status }}
+        </div>
+        <div style="margin-top: 10px; font-size: 0.85em; color: #666;">
+            Click to view more details
+        </div>
     </div>
     """
-    return popup_html
+
+@st.cache_resource
+def get_popup_templates():
+    """
+    Compile the popup templates once per server process. Autoescaping keeps
+    user-entered names, locations and descriptions from injecting HTML.
+    
+    Returns:
+        tuple: (request popup template, responder popup template)
+    """
+    from jinja2 import Environment
+    
+    env = Environment(autoescape=True)
+    return env.from_string(REQUEST_POPUP_TEMPLATE), env.from_string(RESPONDER_POPUP_TEMPLATE)
+
+def format_popup_content(request):
+    """Format popup content for map markers"""
+    request_template, _ = get_popup_templates()
+    return request_template.render(
+        type=request.get('type', 'Unknown'),
+        status=request.get('status', 'Unknown').title(),
+        status_color=STATUS_COLORS.get(request.get('status'), 'red'),
+        urgency=request.get('urgency', 'Unknown'),
+        urgency_color=URGENCY_COLORS.get(request.get('urgency'), 'green'),
+        location=request.get('location', 'Not specified'),
+        time_str=request.get('time_str', 'Unknown'),
+        text=request.get('text', 'No description')[:100],
+        id=request.get('id', 'Unknown')
+    )
 
 def render_sidebar():
     """Render the sidebar with navigation"""
@@ -404,120 +700,100 @@ def render_sidebar():
             st.session_state.user = None
             switch_page("app")
 
+LEGEND_SYMBOL_STYLE = "color: white; text-align: center; line-height: 16px; font-size: 12px;"
+
+# Static legend markup, sent to the browser as one element
+MAP_LEGEND_HTML = f"""
+<div class="legend">
+    <h4 style="margin-top: 0;">🗺️ Map Legend</h4>
+    <strong>Emergency Cases:</strong>
+    <div class="legend-item"><span class="legend-color" style="background-color: red;"></span>High Urgency - Pending</div>
+    <div class="legend-item"><span class="legend-color" style="background-color: orange;"></span>Medium Urgency</div>
+    <div class="legend-item"><span class="legend-color" style="background-color: yellow;"></span>Low Urgency - Pending</div>
+    <div class="legend-item"><span class="legend-color" style="background-color: green;"></span>Resolved Cases</div>
+    <hr>
+    <strong>Responders &amp; Volunteers:</strong>
+    <div class="legend-item"><span class="legend-color" style="background-color: blue; {LEGEND_SYMBOL_STYLE}">+</span>🚑 First Responder - Available</div>
+    <div class="legend-item"><span class="legend-color" style="background-color: gray; {LEGEND_SYMBOL_STYLE}">+</span>🚑 First Responder - Busy</div>
+    <div class="legend-item"><span class="legend-color" style="background-color: green; {LEGEND_SYMBOL_STYLE}">♥</span>❤️ Volunteer - Available</div>
+    <div class="legend-item"><span class="legend-color" style="background-color: red; {LEGEND_SYMBOL_STYLE}">♥</span>❤️ Volunteer - Busy</div>
+    <hr>
+    <strong>Cluster Markers:</strong>
+    <div class="legend-item"><span class="legend-color" style="background-color: rgba(110, 204, 57, 0.8); color: black; text-align: center; line-height: 16px; font-size: 10px;">5</span>Nearby Items (click to zoom in)</div>
+</div>
+"""
+
 def render_map_legend():
     """Map legend including responders and volunteers"""
-    st.markdown("#### 🗺️ Map Legend")
-    
-    # Emergency Cases Legend
-    st.markdown("**Emergency Cases:**")
-    
-    col1, col2 = st.columns([1, 4])
-    with col1:
-        st.markdown('<div style="width: 20px; height: 20px; background-color: red; border-radius: 50%; margin: 5px;"></div>', unsafe_allow_html=True)
-    with col2:
-        st.markdown("High Urgency - Pending")
-    
-    col1, col2 = st.columns([1, 4])
-    with col1:
-        st.markdown('<div style="width: 20px; height: 20px; background-color: orange; border-radius: 50%; margin: 5px;"></div>', unsafe_allow_html=True)
-    with col2:
-        st.markdown("Medium Urgency")
-    
-    col1, col2 = st.columns([1, 4])
-    with col1:
-        st.markdown('<div style="width: 20px; height: 20px; background-color: yellow; border-radius: 50%; margin: 5px;"></div>', unsafe_allow_html=True)
-    with col2:
-        st.markdown("Low Urgency - Pending")
-    
-    col1, col2 = st.columns([1, 4])
-    with col1:
-        st.markdown('<div style="width: 20px; height: 20px; background-color: green; border-radius: 50%; margin: 5px;"></div>', unsafe_allow_html=True)
-    with col2:
-        st.markdown("Resolved Cases")
-    
-    st.markdown("---")
-    
-    # Responders & Volunteers Legend
-    st.markdown("**Responders & Volunteers:**")
-    
-    col1, col2 = st.columns([1, 4])
-    with col1:
-        st.markdown('<div style="width: 20px; height: 20px; background-color: blue; border-radius: 50%; margin: 5px; color: white; text-align: center; line-height: 20px; font-size: 12px;">+</div>', unsafe_allow_html=True)
-    with col2:
-        st.markdown("🚑 First Responder - Available")
-    
-    col1, col2 = st.columns([1, 4])
-    with col1:
-        st.markdown('<div style="width: 20px; height: 20px; background-color: gray; border-radius: 50%; margin: 5px; color: white; text-align: center; line-height: 20px; font-size: 12px;">+</div>', unsafe_allow_html=True)
-    with col2:
-        st.markdown("🚑 First Responder - Busy")
-    
-    col1, col2 = st.columns([1, 4])
-    with col1:
-        st.markdown('<div style="width: 20px; height: 20px; background-color: green; border-radius: 50%; margin: 5px; color: white; text-align: center; line-height: 20px; font-size: 12px;">♥</div>', unsafe_allow_html=True)
-    with col2:
-        st.markdown("❤️ Volunteer - Available")
-    
-    col1, col2 = st.columns([1, 4])
-    with col1:
-        st.markdown('<div style="width: 20px; height: 20px; background-color: red; border-radius: 50%; margin: 5px; color: white; text-align: center; line-height: 20px; font-size: 12px;">♥</div>', unsafe_allow_html=True)
-    with col2:
-        st.markdown("❤️ Volunteer - Busy")
-    
-    st.markdown("---")
-    
-    # Cluster Markers Legend
-    st.markdown("**Cluster Markers:**")
-    
-    col1, col2 = st.columns([1, 4])
-    with col1:
-        st.markdown('<div style="width: 20px; height: 20px; background-color: black; border-radius: 50%; margin: 5px; color: white; text-align: center; line-height: 20px; font-size: 10px;">i</div>', unsafe_allow_html=True)
-    with col2:
-        st.markdown("Multiple Items at Location")
+    st.markdown(MAP_LEGEND_HTML, unsafe_allow_html=True)
 
-def render_statistics(requests_data,responders_data):
-    """Render enhanced statistics including responders and volunteers"""
-
-    # Emergency requests stats
-    total_requests = len(requests_data) if requests_data else 0
-    pending_requests = sum(1 for r in requests_data if r.get("status") == "pending") if requests_data else 0
-    high_urgency = sum(1 for r in requests_data if r.get("urgency") == "High") if requests_data else 0
-    
-    # Responders and volunteers stats
-    total_responders = len(responders_data) if responders_data else 0
-    available_responders = sum(1 for r in responders_data if not r.get("inAction", False)) if responders_data else 0
-    first_responders = sum(1 for r in responders_data if r.get("role", "").lower() == "first_responder") if responders_data else 0
-    volunteers = sum(1 for r in responders_data if r.get("role", "").lower() == "volunteer") if responders_data else 0
-    
-    st.markdown("""
+# Six-panel statistics bar, filled in by render_statistics
+STATS_TEMPLATE = """
     <div class="stats-container">
         <div class="stat-box">
-            <div class="stat-number" style="color: #1E88E5;">{}</div>
+            <div class="stat-number" style="color: #1E88E5;">{total_requests}</div>
             <div class="stat-label">Total Cases</div>
         </div>
         <div class="stat-box">
-            <div class="stat-number" style="color: #f44336;">{}</div>
+            <div class="stat-number" style="color: #f44336;">{pending_requests}</div>
             <div class="stat-label">Pending</div>
         </div>
         <div class="stat-box">
-            <div class="stat-number" style="color: #e91e63;">{}</div>
+            <div class="stat-number" style="color: #e91e63;">{high_urgency}</div>
             <div class="stat-label">High Urgency</div>
         </div>
         <div class="stat-box">
-            <div class="stat-number" style="color: #4caf50;">{}</div>
+            <div class="stat-number" style="color: #4caf50;">{available_responders}</div>
             <div class="stat-label">Available Help</div>
         </div>
         <div class="stat-box">
-            <div class="stat-number" style="color: #2196f3;">{}</div>
+            <div class="stat-number" style="color: #2196f3;">{first_responders}</div>
             <div class="stat-label">First Responders</div>
         </div>
         <div class="stat-box">
-            <div class="stat-number" style="color: #ff5722;">{}</div>
+            <div class="stat-number" style="color: #ff5722;">{volunteers}</div>
             <div class="stat-label">Volunteers</div>
         </div>
     </div>
-    """.format(total_requests, pending_requests, high_urgency, available_responders, first_responders, volunteers), 
-    unsafe_allow_html=True)
+    """
+
+def render_statistics(requests_df, people, responders_loaded=True):
+    """
+    Render enhanced statistics including responders and volunteers, from the loaders' frames.
+    The responder tiles show a dash when responders were not loaded on this run.
+    """
+    # Emergency requests stats
+    total_requests = len(requests_df)
+    pending_requests = int(requests_df["status"].value_counts().get("pending", 0))
+    high_urgency = int(requests_df["urgency"].value_counts().get("High", 0))
+    
+    # Responders and volunteers stats
+    if responders_loaded:
+        role_counts = people["role"].value_counts()
+        first_responders = int(role_counts.get("first_responder", 0))
+        volunteers = int(role_counts.get("volunteer", 0))
+        available_responders = int(people["available"].sum())
+    else:
+        first_responders = volunteers = available_responders = "—"
+    
+    st.markdown(STATS_TEMPLATE.format(
+        total_requests=total_requests,
+        pending_requests=pending_requests,
+        high_urgency=high_urgency,
+        available_responders=available_responders,
+        first_responders=first_responders,
+        volunteers=volunteers
+    ), unsafe_allow_html=True)
+
+# Tables up to this many rows are drawn as static HTML rather than the interactive grid
+STATIC_TABLE_MAX_ROWS = 25
+
+def render_table(df):
+    """Show a small table as static HTML; larger ones get the sortable, scrollable grid"""
+    if len(df) <= STATIC_TABLE_MAX_ROWS:
+        st.table(df)
+    else:
+        st.dataframe(df, use_container_width=True)
 
 def render_map_filters():
     """Render map filters"""
@@ -585,268 +861,401 @@ def render_map_filters():
     return (show_cases, show_responders, show_volunteers, availability_filter, 
             status_filter, urgency_filter, type_filter, time_filter)
 
-def filter_requests(requests_data, status_filter, urgency_filter, type_filter, time_filter):
-    """Filter requests based on selected criteria"""
+# How far back each time filter option reaches
+TIME_FILTER_HOURS = {
+    "Last 24 Hours": 24,
+    "Last 7 Days": 24 * 7,
+    "Last 30 Days": 24 * 30
+}
+
+def requests_frame(requests_data):
+    """Columnar view of the request fields used for filtering and statistics, row-aligned with requests_data"""
+    import pandas as pd
+    
+    df = pd.DataFrame(requests_data, columns=["status", "urgency", "type", "timestamp"])
+    df["timestamp"] = pd.to_numeric(df["timestamp"], errors="coerce").fillna(0)
+    return df
+
+def responders_frame(responders_data):
+    """Columnar view of responder roles (lowercased) and availability, row-aligned with responders_data"""
+    import pandas as pd
+    
+    df = pd.DataFrame(responders_data, columns=["role", "inAction"])
+    df["role"] = df["role"].fillna("").str.lower()
+    df["available"] = ~df["inAction"].fillna(False).astype(bool)
+    return df[["role", "available"]]
+
+def filter_requests(requests_data, df, status_filter, urgency_filter, type_filter, time_filter):
+    """Filter requests based on selected criteria, using their requests_frame view df"""
     if not requests_data:
         return []
     
-    filtered_requests = []
-    current_time = datetime.now().timestamp() * 1000
+    mask = (
+        df["status"].isin(status_filter) &
+        df["urgency"].isin(urgency_filter) &
+        df["type"].isin(type_filter)
+    )
     
-    for request in requests_data:
-        # Status filter
-        if request.get("status") not in status_filter:
-            continue
-        
-        # Urgency filter
-        if request.get("urgency") not in urgency_filter:
+    # Time filter; requests without a timestamp are always kept
+    if time_filter in TIME_FILTER_HOURS:
+        cutoff = datetime.now().timestamp() * 1000 - TIME_FILTER_HOURS[time_filter] * 60 * 60 * 1000
+        mask &= (df["timestamp"] == 0) | (df["timestamp"] >= cutoff)
+    
+    return list(compress(requests_data, mask))
+
+def filter_responders(responders_data, people, show_responders, show_volunteers, availability_filter):
+    """Filter responders and volunteers by role and availability, using their responders_frame view"""
+    if not (show_responders or show_volunteers) or not responders_data:
+        return []
+    
+    mask = people["role"].ne("first_responder") | show_responders
+    mask &= people["role"].ne("volunteer") | show_volunteers
+    
+    # Filter by availability
+    if availability_filter == "Available Only":
+        mask &= people["available"]
+    elif availability_filter == "Busy Only":
+        mask &= ~people["available"]
+    
+    return list(compress(responders_data, mask))
+
+def markers_in_bounds(records, bounds):
+    """Keep the records whose coordinates fall inside st_folium's returned map bounds"""
+    south, west = bounds["_southWest"]["lat"], bounds["_southWest"]["lng"]
+    north, east = bounds["_northEast"]["lat"], bounds["_northEast"]["lng"]
+    return [
+        record for record in records
+        if record.get("lat") is not None and record.get("lon") is not None
+        and south <= record["lat"] <= north and west <= record["lon"] <= east
+    ]
+
+def create_emergency_map(filtered_requests,filtered_people,as_html=False,fit_to_markers=True):
+    """
+    Create and return the emergency map, or its rendered HTML (cached) when as_html is set.
+    With fit_to_markers off the map is not zoomed to the markers, so the caller can keep
+    the user's own viewport.
+    """
+    # Coordinates were attached to the records when they were loaded
+    placed_requests = [(request, request.get("lat"), request.get("lon")) for request in filtered_requests]
+    placed_people = [(person, person.get("lat"), person.get("lon")) for person in filtered_people]
+    
+    if not as_html:
+        # folium objects are mutable and not safe to share, so each caller gets its own
+        return build_emergency_map(placed_requests, placed_people, fit_to_markers)
+    
+    # The HTML only depends on what is placed where, so identical filter
+    # results reuse it across reruns and sessions. A short digest keeps
+    # Streamlit from hashing every record as a cache key.
+    fingerprint = hashlib.blake2b(
+        json.dumps([placed_requests, placed_people], sort_keys=True, default=str).encode(),
+        digest_size=16
+    ).hexdigest()
+    return render_emergency_map_html(fingerprint, placed_requests, placed_people)
+
+@st.cache_data(max_entries=32)
+def render_emergency_map_html(fingerprint, _placed_requests, _placed_people):
+    """Render the map to a standalone HTML page, once per marker set (keyed on fingerprint)"""
+    return build_emergency_map(_placed_requests, _placed_people).get_root().render()
+
+# Base map tiles come from CARTO's CDN by default; set MAP_TILE_URL to a
+# caching tile proxy ({z}/{x}/{y} template) to serve them from closer by
+MAP_TILE_URL = os.environ.get(
+    "MAP_TILE_URL", "https://{s}.basemaps.cartocdn.com/rastertiles/voyager/{z}/{x}/{y}.png"
+)
+MAP_TILE_ATTRIBUTION = os.environ.get(
+    "MAP_TILE_ATTRIBUTION", "&copy; OpenStreetMap contributors &copy; CARTO"
+)
+
+# Sri Lanka bounds for better default view
+SRI_LANKA_BOUNDS = (
+    (5.9, 79.6),  # Southwest corner
+    (9.9, 81.9)   # Northeast corner
+)
+SRI_LANKA_CENTER = (7.3731, 80.7718)  # Center of Sri Lanka
+
+# Above this many markers the icons are swapped for canvas circle markers
+FAST_MARKER_THRESHOLD = 300
+
+# Above this many markers the map opens on a density heat map, with the
+# markers one layer-control click away
+HEATMAP_THRESHOLD = 500
+
+# Tighter clusters that split as the user zooms in; markers sharing a
+# geocoded town centre fan out at max zoom instead of stacking
+MARKER_CLUSTER_OPTIONS = {
+    "maxClusterRadius": 40,
+    "spiderfyOnMaxZoom": True,
+    "showCoverageOnHover": False
+}
+
+# Leaflet callbacks for FastMarkerCluster rows of [lat, lon, color, icon, tooltip, popup];
+# popups are only bound when a marker is first clicked
+ICON_MARKER_CALLBACK = """
+function (row) {
+    var icon = L.AwesomeMarkers.icon({icon: row[3], markerColor: row[2], prefix: 'glyphicon'});
+    var marker = L.marker(new L.LatLng(row[0], row[1]), {icon: icon});
+    marker.bindTooltip(row[4]);
+    marker.once('click', function () {
+        marker.bindPopup(row[5], {maxWidth: 300}).openPopup();
+    });
+    return marker;
+}
+"""
+
+CIRCLE_MARKER_CALLBACK = """
+function (row) {
+    var marker = L.circleMarker(new L.LatLng(row[0], row[1]), {
+        color: row[2], fillColor: row[2], fillOpacity: 0.8, radius: 6, weight: 1
+    });
+    marker.bindTooltip(row[4]);
+    marker.once('click', function () {
+        marker.bindPopup(row[5], {maxWidth: 300}).openPopup();
+    });
+    return marker;
+}
+"""
+
+def add_fast_markers(m, placed_requests, placed_people, show=True):
+    """
+    Add all markers to the map as a single FastMarkerCluster layer, so markers
+    are built by Leaflet in the browser and overlapping ones are clustered
+    
+    Returns:
+        numpy.ndarray: (n, 2) lat, lon of every marker added
+    """
+    import numpy as np
+    from folium.plugins import FastMarkerCluster
+    
+    rows = []
+    # Filled in place as markers are placed, then trimmed to the ones that had coordinates
+    marker_coords = np.empty((len(placed_requests) + len(placed_people), 2), dtype=np.float64)
+    for request, lat, lon in placed_requests:
+        if lat is None or lon is None:
             continue
-        
-        # Type filter
-        if request.get("type") not in type_filter:
+        marker_coords[len(rows)] = lat, lon
+        color = get_marker_color(request.get("status", "pending"), request.get("urgency", "Medium"))
+        icon = get_marker_icon(request.get("type", "Other"))
+        tooltip = f"{request.get('type', 'Unknown')} - {request.get('urgency', 'Unknown')} - {request.get('status', 'Unknown').title()}"
+        rows.append([lat, lon, color, icon, tooltip, format_popup_content(request)])
+    
+    for person, lat, lon in placed_people:
+        if lat is None or lon is None:
             continue
-        
-        # Time filter
-        if time_filter != "All Time":
-            request_time = request.get("timestamp", 0)
-            if request_time:
-                time_diff = current_time - request_time
-                hours_diff = time_diff / (1000 * 60 * 60)
-                
-                if time_filter == "Last 24 Hours" and hours_diff > 24:
-                    continue
-                elif time_filter == "Last 7 Days" and hours_diff > (24 * 7):
-                    continue
-                elif time_filter == "Last 30 Days" and hours_diff > (24 * 30):
-                    continue
-        
-        filtered_requests.append(request)
+        marker_coords[len(rows)] = lat, lon
+        person_type = person.get('role', '').lower()
+        is_available = not person.get('inAction', False)
+        color, icon = get_responder_style(person_type, is_available)
+        status_text = "Available" if is_available else "Busy"
+        tooltip = f"{person_type.replace('_', ' ').title()}: {person.get('fullName', 'Unknown')} - {status_text}"
+        rows.append([lat, lon, color, icon, tooltip, create_responder_popup_content(person)])
     
-    return filtered_requests
+    # Icon markers are DOM nodes; past a few hundred, plain circles on the canvas stay fast
+    callback = ICON_MARKER_CALLBACK if len(rows) <= FAST_MARKER_THRESHOLD else CIRCLE_MARKER_CALLBACK
+    FastMarkerCluster(
+        rows, callback=callback, options=MARKER_CLUSTER_OPTIONS, name="Markers", show=show
+    ).add_to(m)
+    return marker_coords[:len(rows)]
 
-def create_emergency_map(requests_data,responders_data,filters):
-    """Create and return the emergency map with caching"""
-    (show_cases, show_responders, show_volunteers, availability_filter, 
-     status_filter, urgency_filter, type_filter, time_filter) = filters
-    # Sri Lanka bounds for better default view
-    sri_lanka_bounds = [
-        [5.9, 79.6],  # Southwest corner
-        [9.9, 81.9]   # Northeast corner
-    ]
+def fit_map_to_markers(m, marker_coords, sri_lanka_bounds):
+    """Zoom to the markers when they leave Sri Lanka or there are only a few"""
+    if not len(marker_coords):
+        return
+    
+    # Check if any markers are outside Sri Lanka bounds
+    lats, lons = marker_coords[:, 0], marker_coords[:, 1]
+    (south, west), (north, east) = sri_lanka_bounds
+    markers_outside_sl = bool(((lats < south) | (lats > north) | (lons < west) | (lons > east)).any())
+    
+    # Only fit to markers if they're outside Sri Lanka or if we want to zoom in on a specific area
+    if markers_outside_sl or len(marker_coords) <= 5:
+        m.fit_bounds([[float(lats.min()), float(lons.min())], [float(lats.max()), float(lons.max())]])
+
+def build_emergency_map(placed_requests, placed_people, fit_to_markers=True):
+    """
+    Build the folium map for a set of placed markers
     
-    # Default center to Sri Lanka (Central location)
-    center_lat, center_lon = 7.3731, 80.7718  # Center of Sri Lanka
+    Args:
+        placed_requests (list): (request, lat, lon) tuples
+        placed_people (list): (responder, lat, lon) tuples
+        fit_to_markers (bool): Zoom the map to the placed markers
+    """
+    import folium
     
     # Create map with Sri Lanka focus
     m = folium.Map(
-        location=[center_lat, center_lon],
+        location=list(SRI_LANKA_CENTER),
         zoom_start=8,  # Optimal zoom to show entire Sri Lanka
-        tiles="OpenStreetMap"
+        tiles=MAP_TILE_URL,
+        attr=MAP_TILE_ATTRIBUTION,
+        prefer_canvas=True  # Draw vector markers on one canvas instead of an SVG node each
     )
     
     # Set bounds to Sri Lanka
-    m.fit_bounds(sri_lanka_bounds)
+    m.fit_bounds(SRI_LANKA_BOUNDS)
     
-    # Add markers for each request
-    location_groups = {}
-    marker_coords = []  # Store coordinates for auto-fitting
-    
-    if show_cases and requests_data:
-        filtered_requests = filter_requests(requests_data, status_filter, urgency_filter, type_filter, time_filter)
-        
-        for request in filtered_requests:
-            location = request.get("location", "")
-            if not location:
-                continue
+    # Thousands of points read better, and draw faster, as one density layer
+    use_heatmap = len(placed_requests) + len(placed_people) > HEATMAP_THRESHOLD
+    marker_coords = add_fast_markers(m, placed_requests, placed_people, show=not use_heatmap)
+    if use_heatmap:
+        from folium.plugins import HeatMap
         
-            # Use cached geocoding
-            lat, lon = cached_geocode_address(location)
-        
-            if lat is None or lon is None:
-                continue
-        
-            marker_coords.append([lat, lon])
-            lat_rounded = round(lat, 3)
-            lon_rounded = round(lon, 3)
-            coord_key = f"{lat_rounded},{lon_rounded}"
-
-            if coord_key not in location_groups:
-                location_groups[coord_key] = {
-                    'lat': lat,
-                    'lon': lon,
-                    'requests': [],
-                    'responders': []
-                }
-        
-            location_groups[coord_key]['requests'].append(request)
+        HeatMap(marker_coords, name="Density", radius=15, blur=10, min_opacity=0.3).add_to(m)
+        folium.LayerControl().add_to(m)
+    
+    if fit_to_markers:
+        # Adjust map bounds if we have markers
+        fit_map_to_markers(m, marker_coords, SRI_LANKA_BOUNDS)
+    
+    return m
 
+@st.fragment
+def render_map_panel(filtered_requests, filtered_responders):
+    """Render the map and its options; map interactions rerun only this panel"""
+    from streamlit_folium import st_folium
     
-    # Add responders and volunteers markers
-    if (show_responders or show_volunteers) and responders_data:
-        for person in responders_data:
-            person_type = person.get('role', '').lower()
+    # Clicks and the viewport are only sent back to Python when asked for
+    show_click_coords = st.checkbox("Show clicked coordinates", value=False)
+    cull_to_view = st.checkbox("Only draw markers in view", value=False)
 
-            if person_type == 'first_responder' and not show_responders:
-                continue
-            if person_type == 'volunteer' and not show_volunteers:
-                continue
+    map_render_cache = st.session_state.map_render_cache
+    if not (show_click_coords or cull_to_view):
+        # Nothing needs to come back from the map, so embed it as plain HTML
+        # and skip the streamlit-folium component round trip
+        if "html" not in map_render_cache:
+            with st.spinner("Generating map..."):
+                map_render_cache["html"] = create_emergency_map(filtered_requests, filtered_responders, as_html=True)
+        components_html(map_render_cache["html"], width=700, height=500)
+    else:
+        # One stable key: the component keeps its viewport across filter changes
+        # and session state doesn't collect an entry per filter combination
+        map_key = "emergency_map"
 
-            # Filter by availability
-            in_action = person.get('inAction', False)
-            if availability_filter == "Available Only" and in_action:
-                continue
-            elif availability_filter == "Busy Only" and not in_action:
-                continue
+        # The viewport reported by the map on the previous interaction
+        view_bounds = None
+        view_center = None
+        view_zoom = None
+        if cull_to_view:
+            previous_state = st.session_state.get(map_key) or {}
+            bounds = previous_state.get("bounds") or {}
+            if (bounds.get("_southWest") or {}).get("lat") is not None:
+                view_bounds = bounds
+            center = previous_state.get("center") or {}
+            if center.get("lat") is not None and previous_state.get("zoom") is not None:
+                view_center = [center["lat"], center["lng"]]
+                view_zoom = previous_state["zoom"]
 
-            location = person.get("location", "")
-            if not location:
-                continue
-            
-            # Use cached geocoding
-            lat, lon = cached_geocode_address(location)
-            
-            if lat is None or lon is None:
-                continue
-            
-            marker_coords.append([lat, lon])
-            
-            # Round coordinates to group nearby markers
-            lat_rounded = round(lat, 3)
-            lon_rounded = round(lon, 3)
-            coord_key = f"{lat_rounded},{lon_rounded}"
-            
-            if coord_key not in location_groups:
-                location_groups[coord_key] = {
-                    'lat': lat,
-                    'lon': lon,
-                    'requests': [],
-                    'responders': []
-                }
-            
-            location_groups[coord_key]['responders'].append(person)
-
-    # Create markers for each location group
-    for coord_key, group in location_groups.items():
-        requests = group['requests']
-        responders = group['responders']
-        base_lat = group['lat']
-        base_lon = group['lon']
-        
-        # If only one item at this location, create single marker
-        if len(requests) + len(responders) == 1:
-            if requests:
-                request = requests[0]
-                color = get_marker_color(request.get("status", "pending"), request.get("urgency", "Medium"))
-                icon = get_marker_icon(request.get("type", "Other"))
-                popup_content = format_popup_content(request)
-                tooltip = f"{request.get('type', 'Unknown')} - {request.get('urgency', 'Unknown')} - {request.get('status', 'Unknown').title()}"
-                
-                folium.Marker(
-                    location=[base_lat, base_lon],
-                    popup=folium.Popup(popup_content, max_width=300),
-                    tooltip=tooltip,
-                    icon=folium.Icon(color=color, icon=icon, prefix='glyphicon')
-                ).add_to(m)
-            
-            elif responders:
-                person = responders[0]
-                person_type = person.get('role', '').lower()
-                is_available = not person.get('inAction', False)
-                icon = create_responder_icon(person_type, is_available)
-                popup_content = create_responder_popup_content(person)
-                status_text = "Available" if is_available else "Busy"
-                tooltip = f"{person_type.replace('_', ' ').title()}: {person.get('fullName', 'Unknown')} - {status_text}"
-                
-                folium.Marker(
-                    location=[base_lat, base_lon],
-                    popup=folium.Popup(popup_content, max_width=300),
-                    tooltip=tooltip,
-                    icon=icon
-                ).add_to(m)
-        
+        # Create and display map
+        if view_bounds:
+            # Only the markers are culled; the map is not re-fitted to them, or
+            # each smaller view would zoom it out a step further. The viewport
+            # itself is handed back to st_folium as center and zoom below.
+            with st.spinner("Generating map..."):
+                emergency_map = create_emergency_map(
+                    markers_in_bounds(filtered_requests, view_bounds),
+                    markers_in_bounds(filtered_responders, view_bounds),
+                    fit_to_markers=False
+                )
         else:
-            # Multiple items at same location - create cluster or offset markers
-            offset_distance = 0.001  # Small offset to separate markers
-            total_items = len(requests) + len(responders)
-            
-            # Create a circular arrangement for overlapping markers
-            import math
-            for i, request in enumerate(requests):
-                angle = (2 * math.pi * i) / total_items
-                lat_offset = base_lat + (offset_distance * math.cos(angle))
-                lon_offset = base_lon + (offset_distance * math.sin(angle))
-                
-                color = get_marker_color(request.get("status", "pending"), request.get("urgency", "Medium"))
-                icon = get_marker_icon(request.get("type", "Other"))
-                popup_content = format_popup_content(request)
-                tooltip = f"📍 {request.get('type', 'Unknown')} - {request.get('urgency', 'Unknown')} - {request.get('status', 'Unknown').title()}"
-                
-                folium.Marker(
-                    location=[lat_offset, lon_offset],
-                    popup=folium.Popup(popup_content, max_width=300),
-                    tooltip=tooltip,
-                    icon=folium.Icon(color=color, icon=icon, prefix='glyphicon')
-                ).add_to(m)
-            
-            # Add responders with offset
-            for j, person in enumerate(responders):
-                angle = (2 * math.pi * (len(requests) + j)) / total_items
-                lat_offset = base_lat + (offset_distance * math.cos(angle))
-                lon_offset = base_lon + (offset_distance * math.sin(angle))
-                
-                person_type = person.get('role', '').lower()
-                is_available = not person.get('inAction', False)
-                icon = create_responder_icon(person_type, is_available)
-                popup_content = create_responder_popup_content(person)
-                status_text = "Available" if is_available else "Busy"
-                tooltip = f"👤 {person_type.replace('_', ' ').title()}: {person.get('fullName', 'Unknown')} - {status_text}"
-                
-                folium.Marker(
-                    location=[lat_offset, lon_offset],
-                    popup=folium.Popup(popup_content, max_width=300),
-                    tooltip=tooltip,
-                    icon=icon
-                ).add_to(m)
-            
-            # Add a central info marker showing the count
-            cluster_popup = f"""
-            <div style="font-family: Arial, sans-serif; min-width: 200px; text-align: center;">
-                <h4 style="margin-bottom: 15px; color: #333;">📍 Multiple Items at this Location</h4>
-                <p><strong>Emergency Cases:</strong> {len(requests)}</p>
-                <p><strong>Responders/Volunteers:</strong> {len(responders)}</p>
-                <hr>
-                <p style="font-size: 0.9em; color: #666;">
-                    Individual markers are slightly offset around this location
-                </p>
-            </div>
-            """
-            
-            folium.Marker(
-                location=[base_lat, base_lon],
-                popup=folium.Popup(cluster_popup, max_width=250),
-                tooltip=f"📍 {total_items} items at this location",
-                icon=folium.Icon(color='black', icon='info-sign', prefix='glyphicon')
-            ).add_to(m)
-
-    # Adjust map bounds if we have markers
-    if marker_coords:
-        # Check if any markers are outside Sri Lanka bounds
-        markers_outside_sl = any(
-            coord[0] < sri_lanka_bounds[0][0] or coord[0] > sri_lanka_bounds[1][0] or
-            coord[1] < sri_lanka_bounds[0][1] or coord[1] > sri_lanka_bounds[1][1]
-            for coord in marker_coords
+            if "map" not in map_render_cache:
+                with st.spinner("Generating map..."):
+                    map_render_cache["map"] = create_emergency_map(filtered_requests, filtered_responders)
+            emergency_map = map_render_cache["map"]
+
+        returned_objects = []
+        if show_click_coords:
+            returned_objects.append("last_clicked")
+        if cull_to_view:
+            returned_objects.extend(["bounds", "center", "zoom"])
+
+        # Display map with minimal returned objects to reduce rerun triggers
+        map_data = st_folium(
+            emergency_map, 
+            width=700, 
+            height=500,
+            returned_objects=returned_objects,
+            center=view_center,
+            zoom=view_zoom,
+            key=map_key
         )
-        
-        # Only fit to markers if they're outside Sri Lanka or if we want to zoom in on a specific area
-        if markers_outside_sl or len(marker_coords) <= 5:
-            m.fit_bounds(marker_coords)
-    
-    return m
+
+        # Handle map interactions without triggering rerun
+        if show_click_coords and map_data.get("last_clicked") and map_data["last_clicked"].get("lat"):
+            clicked_lat = map_data["last_clicked"]["lat"]
+            clicked_lng = map_data["last_clicked"]["lng"]
+            st.info(f"📍 Map clicked at: {clicked_lat:.4f}, {clicked_lng:.4f}")
+
+@st.fragment
+def render_case_details(filtered_requests, case_labels):
+    """Render the case picker and the selected case's details"""
+    if filtered_requests:
+        selected_case = st.selectbox(
+            "Select a case to view details:",
+            options=range(len(filtered_requests)),
+            format_func=case_labels.__getitem__
+        )
+
+        if selected_case is not None:
+            case = filtered_requests[selected_case]
+
+            col1, col2 = st.columns(2)
+            with col1:
+                st.write(f"**Type:** {case.get('type', 'Unknown')}")
+                st.write(f"**Status:** {case.get('status', 'Unknown').title()}")
+                st.write(f"**Urgency:** {case.get('urgency', 'Unknown')}")
+                st.write(f"**Location:** {case.get('location', 'Not specified')}")
+
+            with col2:
+                st.write(f"**Submitted:** {case.get('time_str', 'Unknown')}")
+                st.write(f"**Request ID:** {case.get('id', 'Unknown')}")
+
+            st.write("**Description:**")
+            st.write(case.get('text', 'No description available'))
+    else:
+        st.info("No emergency cases available to display details.")
+
+@st.fragment
+def render_responder_details(filtered_responders, responder_labels):
+    """Render the responder picker and the selected responder's details"""
+    if filtered_responders:
+        selected_responder = st.selectbox(
+            "Select a responder/volunteer to view details:",
+            options=range(len(filtered_responders)),
+            format_func=responder_labels.__getitem__
+        )
+
+        if selected_responder is not None:
+            responder = filtered_responders[selected_responder]
+
+            col1, col2 = st.columns(2)
+            with col1:
+                st.write(f"**Name:** {responder.get('fullName', 'Unknown')}")
+                st.write(f"**Role:** {responder.get('role', 'Unknown').replace('_', ' ').title()}")
+                status = "🟢 Available" if not responder.get("inAction", False) else "🔴 Busy"
+                st.write(f"**Status:** {status}")
+                st.write(f"**Location:** {responder.get('location', 'Not specified')}")
+
+            with col2:
+                st.write(f"**Email:** {responder.get('email', 'Not provided')}")
+                st.write(f"**Phone:** {responder.get('phone', 'Not provided')}")
+                st.write(f"**Experience:** {responder.get('experience', 'Not specified')}")
+
+            st.write("**Specialities:**")
+            specialities = responder.get('specialities', [])
+            if isinstance(specialities, list) and specialities:
+                for spec in specialities:
+                    st.write(f"• {spec}")
+            else:
+                st.write("No specialities specified")
+    else:
+        st.info("No responders or volunteers available to display details.")
 
 def main():
     # Check authentication
     check_authentication()
     
+    # Heavy table library is only imported once the user is authenticated
+    import pandas as pd
+    
     # Render sidebar
     render_sidebar()
     
@@ -854,41 +1263,34 @@ def main():
     st.markdown('<h1 class="main-title">🗺️ Emergency Resources Map</h1>', unsafe_allow_html=True)
     
 
-    # Initialize session state for map data caching
-    if 'map_data_cache' not in st.session_state:
-        st.session_state.map_data_cache = None
-    if 'responders_data_cache' not in st.session_state:
-        st.session_state.responders_data_cache = None
-    if 'last_filter_state' not in st.session_state:
-        st.session_state.last_filter_state = None
-
-    # Get all requests (cache to avoid repeated API calls)
-    if st.session_state.map_data_cache is None:
-        with st.spinner("Loading emergency data..."):
-            response = get_all_requests()
-        if "data" not in response:
-            st.error(f"Error loading data: {response.get('error', 'Unknown error')}")
-            return
-        st.session_state.map_data_cache = response["data"]
-
-    if st.session_state.responders_data_cache is None:
-        with st.spinner("Loading responders and volunteers..."):
-            st.session_state.responders_data_cache = load_responders_and_volunteers()   #Everything handled inside this func
-
-    requests_data = st.session_state.map_data_cache or []
-    responders_data = st.session_state.responders_data_cache or []
+    # Get all requests; the loaders cache them with a TTL, so new data shows up on its own
+    try:
+        response = load_all_requests()
+    except DataLoadError as e:
+        st.error(f"Error loading data: {e}")
+        return
+    requests_data, requests_df = response["data"], response["frame"]
+    if response["geocode_warning"]:
+        st.warning(response["geocode_warning"])
+    
+    # With no cases, responders decide whether there is anything to show at all
+    responders_loaded = not requests_data
+    if responders_loaded:
+        responders_data, people = get_responders_and_volunteers()
+    else:
+        responders_data, people = [], responders_frame([])
     
     if not requests_data and not responders_data:
         st.info("No Data found.")
         # Add refresh button
         if st.button("🔄 Refresh Data"):
-            st.session_state.map_data_cache = None
-            st.session_state.responders_data_cache = None
+            load_all_requests.clear()
+            load_responders_and_volunteers.clear()
             st.rerun()
         return
     
-    # Render statistics
-    render_statistics(requests_data,responders_data)
+    # Statistics sit above the filters but are filled in once the data they need is loaded
+    statistics_container = st.container()
     
     # Render filters
     filters = render_map_filters()    
@@ -896,21 +1298,41 @@ def main():
     (show_cases, show_responders, show_volunteers, availability_filter, 
      status_filter, urgency_filter, type_filter, time_filter) = filters
     
+    # Otherwise they are only fetched once the map is set to show them
+    if (show_responders or show_volunteers) and requests_data:
+        responders_data, people = get_responders_and_volunteers()
+        responders_loaded = True
+    
+    # Render statistics
+    with statistics_container:
+        render_statistics(requests_df, people, responders_loaded)
+    
+    # Map and detail interactions rerun only their fragments, so a full run
+    # means the filters or the data changed and the results are rebuilt
+    filtered_requests = filter_requests(requests_data, requests_df, status_filter, urgency_filter, type_filter, time_filter) if show_cases else []
+    filtered_responders = filter_responders(responders_data, people, show_responders, show_volunteers, availability_filter)
+    st.session_state.map_render_cache = {}
+    
+    # Selectbox labels for the detail sections
+    case_labels = [f"{r.get('type', 'Unknown')} - {r.get('urgency', 'Unknown')} - {r.get('location', 'Unknown')[:20]}..." for r in filtered_requests]
+    responder_labels = [f"{r.get('fullName', 'Unknown')} - {r.get('role', 'Unknown').replace('_', ' ').title()}" for r in filtered_responders]
+    
     # Add refresh button for manual data refresh
     col_refresh, col_info = st.columns([1, 4])
     with col_refresh:
         if st.button("🔄 Refresh Data"):
-            st.session_state.map_data_cache = None
-            st.session_state.responders_data_cache = None
+            load_all_requests.clear()
+            load_responders_and_volunteers.clear()
             st.rerun()
 
     with col_info:
         info_parts = []
         if show_cases:
             info_parts.append(f"{len(requests_data)} emergency cases")
-        if show_responders or show_volunteers:
-            responder_count = sum(1 for r in responders_data if r.get("role", "").lower() == "first_responder")
-            volunteer_count = sum(1 for r in responders_data if r.get("role", "").lower() == "volunteer")
+        if (show_responders or show_volunteers) and responders_data:
+            role_counts = people["role"].value_counts()
+            responder_count = int(role_counts.get("first_responder", 0))
+            volunteer_count = int(role_counts.get("volunteer", 0))
             if show_responders:
                 info_parts.append(f"{responder_count} first responders")
             if show_volunteers:
@@ -923,27 +1345,7 @@ def main():
     map_col, legend_col = st.columns([8, 3])
     
     with map_col:
-        # Create and display map
-        with st.spinner("Generating map..."):
-            emergency_map = create_emergency_map(requests_data, responders_data, filters)
-        
-        # Display map with key to prevent unnecessary reruns
-        map_key = f"emergency_map_{hash(str(filters))}"
-        
-        # Display map with minimal returned objects to reduce rerun triggers
-        map_data = st_folium(
-            emergency_map, 
-            width=700, 
-            height=500,
-            returned_objects=["last_clicked"],
-            key=map_key
-        )
-        
-        # Handle map interactions without triggering rerun
-        if map_data.get("last_clicked") and map_data["last_clicked"].get("lat"):
-            clicked_lat = map_data["last_clicked"]["lat"]
-            clicked_lng = map_data["last_clicked"]["lng"]
-            st.info(f"📍 Map clicked at: {clicked_lat:.4f}, {clicked_lng:.4f}")
+        render_map_panel(filtered_requests, filtered_responders)
     
     with legend_col:
         # LEGEND NOW PROPERLY RENDERED IN RIGHT COLUMN
@@ -954,55 +1356,22 @@ def main():
     # Additional information
     st.markdown("---")
     
-    # Get filtered requests for expandable sections
-    filtered_requests = filter_requests(requests_data, status_filter, urgency_filter, type_filter, time_filter) if show_cases else []
-    
-    # Filter responders based on availability filter
-    filtered_responders = []
-    if show_responders or show_volunteers:
-        for person in responders_data:
-            person_type = person.get('role', '').lower()
-            
-            # Type filter
-            if person_type == 'first_responder' and not show_responders:
-                continue
-            if person_type == 'volunteer' and not show_volunteers:
-                continue
-            
-            # Availability filter
-            in_action = person.get('inAction', False)
-            if availability_filter == "Available Only" and in_action:
-                continue
-            elif availability_filter == "Busy Only" and not in_action:
-                continue
-            
-            filtered_responders.append(person)
-
     # Create expandable sections to reduce initial load
     with st.expander("📋 Recent Emergency Activity", expanded=False):
         if filtered_requests:
             # Show recent requests in a table
-            recent_requests = sorted(filtered_requests, key=lambda x: x.get("timestamp", 0), reverse=True)[:10]
-            
-            df_data = []
-            for req in recent_requests:
-                timestamp = req.get("timestamp", 0)
-                if timestamp:
-                    dt = datetime.fromtimestamp(timestamp / 1000)
-                    time_str = dt.strftime("%b %d, %I:%M %p")
-                else:
-                    time_str = "Unknown"
-                
-                df_data.append({
-                    "Time": time_str,
-                    "Type": req.get("type", "Unknown"),
-                    "Urgency": req.get("urgency", "Unknown"),
-                    "Status": req.get("status", "pending").title(),
-                    "Location": req.get("location", "Not specified")[:30] + "..." if len(req.get("location", "")) > 30 else req.get("location", "Not specified")
-                })
+            recent_requests = heapq.nlargest(10, filtered_requests, key=lambda x: x.get("timestamp", 0))
             
-            df = pd.DataFrame(df_data)
-            st.dataframe(df, use_container_width=True)
+            # Build the table column by column
+            locations = pd.Series([req.get("location", "Not specified") for req in recent_requests], dtype=object)
+            df = pd.DataFrame({
+                "Time": [req.get("short_time_str", "Unknown") for req in recent_requests],
+                "Type": [req.get("type", "Unknown") for req in recent_requests],
+                "Urgency": [req.get("urgency", "Unknown") for req in recent_requests],
+                "Status": pd.Series([req.get("status", "pending") for req in recent_requests], dtype=object).str.title(),
+                "Location": locations.where(locations.str.len() <= 30, locations.str.slice(0, 30) + "...")
+            })
+            render_table(df)
         else:
             st.info("No emergency cases match the current filters.")
     
@@ -1014,10 +1383,12 @@ def main():
             
             with tab1:
                 # Summary statistics
-                available_count = sum(1 for r in filtered_responders if not r.get("inAction", False))
+                filtered_people = responders_frame(filtered_responders)
+                role_counts = filtered_people["role"].value_counts()
+                available_count = int(filtered_people["available"].sum())
                 busy_count = len(filtered_responders) - available_count
-                first_responder_count = sum(1 for r in filtered_responders if r.get("role", "").lower() == "first_responder")
-                volunteer_count = sum(1 for r in filtered_responders if r.get("role", "").lower() == "volunteer")
+                first_responder_count = int(role_counts.get("first_responder", 0))
+                volunteer_count = int(role_counts.get("volunteer", 0))
                 
                 col1, col2, col3, col4 = st.columns(4)
                 with col1:
@@ -1033,92 +1404,35 @@ def main():
                 # Detailed list
                 responder_data = []
                 for person in filtered_responders:
-                    status = "🟢 Available" if not person.get("inAction", False) else "🔴 Busy"
-                    role_emoji = "🚑" if person.get("role", "").lower() == "first_responder" else "❤️"
+                    role = person.get("role") or "Unknown"
+                    status = "🔴 Busy" if person.get("inAction", False) else "🟢 Available"
+                    role_emoji = "🚑" if role.lower() == "first_responder" else "❤️"
+                    location = person.get("location", "Not specified")
+                    specialities = format_specialities(person.get("specialities", []))
                     
-                    responder_data.append({
-                        "Name": person.get("fullName", "Unknown"),
-                        "Role": f"{role_emoji} {person.get('role', 'Unknown').replace('_', ' ').title()}",
-                        "Status": status,
-                        "Location": person.get("location", "Not specified")[:25] + "..." if len(person.get("location", "")) > 25 else person.get("location", "Not specified"),
-                        "Specialities": format_specialities(person.get("specialities", []))[:30] + "..." if len(format_specialities(person.get("specialities", []))) > 30 else format_specialities(person.get("specialities", []))
-                    })
+                    responder_data.append((
+                        person.get("fullName", "Unknown"),
+                        f"{role_emoji} {role.replace('_', ' ').title()}",
+                        status,
+                        location[:25] + "..." if len(location) > 25 else location,
+                        specialities[:30] + "..." if len(specialities) > 30 else specialities
+                    ))
                 
                 if responder_data:
-                    df_responders = pd.DataFrame(responder_data)
-                    st.dataframe(df_responders, use_container_width=True)
+                    df_responders = pd.DataFrame.from_records(
+                        responder_data, columns=["Name", "Role", "Status", "Location", "Specialities"]
+                    )
+                    render_table(df_responders)
         else:
             st.info("No responders or volunteers match the current filters.")
     
     # Add detailed case view in expandable section
     with st.expander("🔍 Detailed Case Information", expanded=False):
-        if filtered_requests:
-            selected_case = st.selectbox(
-                "Select a case to view details:",
-                options=range(len(filtered_requests)),
-                format_func=lambda x: f"{filtered_requests[x].get('type', 'Unknown')} - {filtered_requests[x].get('urgency', 'Unknown')} - {filtered_requests[x].get('location', 'Unknown')[:20]}..."
-            )
-            
-            if selected_case is not None:
-                case = filtered_requests[selected_case]
-                
-                col1, col2 = st.columns(2)
-                with col1:
-                    st.write(f"**Type:** {case.get('type', 'Unknown')}")
-                    st.write(f"**Status:** {case.get('status', 'Unknown').title()}")
-                    st.write(f"**Urgency:** {case.get('urgency', 'Unknown')}")
-                    st.write(f"**Location:** {case.get('location', 'Not specified')}")
-                
-                with col2:
-                    timestamp = case.get("timestamp", 0)
-                    if timestamp:
-                        dt = datetime.fromtimestamp(timestamp / 1000)
-                        time_str = dt.strftime("%b %d, %Y %I:%M %p")
-                    else:
-                        time_str = "Unknown"
-                    st.write(f"**Submitted:** {time_str}")
-                    st.write(f"**Request ID:** {case.get('id', 'Unknown')}")
-                
-                st.write("**Description:**")
-                st.write(case.get('text', 'No description available'))
-        else:
-            st.info("No emergency cases available to display details.")
+        render_case_details(filtered_requests, case_labels)
     
     # Add responder details section
     with st.expander("👤 Responder/Volunteer Details", expanded=False):
-        if filtered_responders:
-            selected_responder = st.selectbox(
-                "Select a responder/volunteer to view details:",
-                options=range(len(filtered_responders)),
-                format_func=lambda x: f"{filtered_responders[x].get('fullName', 'Unknown')} - {filtered_responders[x].get('role', 'Unknown').replace('_', ' ').title()}"
-            )
-            
-            if selected_responder is not None:
-                responder = filtered_responders[selected_responder]
-                
-                col1, col2 = st.columns(2)
-                with col1:
-                    st.write(f"**Name:** {responder.get('fullName', 'Unknown')}")
-                    st.write(f"**Role:** {responder.get('role', 'Unknown').replace('_', ' ').title()}")
-                    status = "🟢 Available" if not responder.get("inAction", False) else "🔴 Busy"
-                    st.write(f"**Status:** {status}")
-                    st.write(f"**Location:** {responder.get('location', 'Not specified')}")
-                
-                with col2:
-                    st.write(f"**Email:** {responder.get('email', 'Not provided')}")
-                    st.write(f"**Phone:** {responder.get('phone', 'Not provided')}")
-                    st.write(f"**Experience:** {responder.get('experience', 'Not specified')}")
-                
-                st.write("**Specialities:**")
-                specialities = responder.get('specialities', [])
-                if isinstance(specialities, list) and specialities:
-                    for spec in specialities:
-                        st.write(f"• {spec}")
-                else:
-                    st.write("No specialities specified")
-        else:
-            st.info("No responders or volunteers available to display details.")
-
+        render_responder_details(filtered_responders, responder_labels)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file